@@ -0,0 +1,157 @@
+import subprocess
+import time
+import json
+import socket
+
+from utils.metrics import metered_submit
+from utils.profiler import profiled
+from utils.resources import ResourceSpec, translation, translation_env
+from utils.submission import classify_error, VALIDATION
+
+
+class DockerDriver:
+    """Baseline senza orchestratore: `docker run` diretto sul nodo locale (o via ssh su `host`).
+
+    Espone la stessa interfaccia degli altri driver, così i test possono confrontare
+    l'overhead del control plane con il semplice avvio di un container.
+    """
+
+    PRIORITY_SUPPORT = "none: single node baseline"
+
+    def __init__(self, name_prefix="cob-job", image="192.168.15.9:5000/cob-job-worker:latest", host=None):
+        self.name_prefix = name_prefix
+        self.image = image
+        # Se impostato, i comandi docker vengono eseguiti su quel nodo via ssh
+        self.host = host
+        self.nfs_mount = "type=bind,source=/srv/nfs/cob_results,target=/mnt/results"
+        # Categoria dell'ultimo errore di submit (vedi utils/submission.py)
+        self.last_error = None
+        # Traduzione delle risorse dell'ultimo submit (vedi utils/resources.py)
+        self.last_resources = None
+
+    @profiled("subprocess", cat="spawn")
+    def _run(self, cmd):
+        if self.host:
+            cmd = f"ssh {self.host} \"{cmd}\""
+        return subprocess.run(cmd, shell=True, capture_output=True, text=True)
+
+    @profiled("submit_job")
+    @metered_submit
+    def submit_job(self, job_id, job_type="cpu", duration=10, constraints=None, cpu_reservation=None,
+                   restart_policy="none", command=None, priority=None,
+                   gang_size=1, extra_env=None, resources=None):
+        container_name = f"{self.name_prefix}_{job_id}"
+
+        args = ""
+        try:
+            spec = ResourceSpec.from_args(resources, cpu_reservation)
+        except (TypeError, ValueError) as e:
+            self.last_error = VALIDATION
+            print(f"[DOCKER] Invalid resources for {job_id}: {e}")
+            return False
+        self.last_resources = self.translate_resources(spec)
+        for flag, val in self.last_resources["native"].items():
+            args += f" --{flag} {val}"
+
+        if restart_policy.lower() not in ["none", "never"]:
+            args += " --restart on-failure:2"
+
+        # Variabili aggiuntive per il worker (es. THREADS/PROCS dei job 'parallel')
+        env_args = "".join(f"--env {key}={val} " for key, val in (extra_env or {}).items())
+
+        final_cmd = ""
+        if command:
+            final_cmd = f" {command}"
+
+        if gang_size > 1:
+            # Nessun co-scheduling senza orchestratore: la baseline supporta solo job singoli
+            print(f"[DOCKER] Gang jobs are not supported by the baseline driver ({job_id})")
+            self.last_error = VALIDATION
+            return False
+
+        # Constraints e priorità non hanno senso su un singolo nodo: vengono ignorati
+        cmd = (
+            f"docker run "
+            f"--detach "
+            f"--name {container_name} "
+            f"--label app=cob-job "
+            f"--env JOB_ID={job_id} "
+            f"--env JOB_TYPE={job_type} "
+            f"--env DURATION={duration} "
+            f"--env NODE_NAME={self.host or socket.gethostname()} "
+            f"--env RESOURCES={translation_env(self.last_resources)} "
+            f"{env_args}"
+            f"--mount {self.nfs_mount} "
+            f"{args} "
+            f"{self.image}"
+            f"{final_cmd}"
+        )
+
+        res = self._run(cmd)
+        if res.returncode != 0:
+            self.last_error = classify_error(res.stderr)
+            print(f"[DOCKER] Error launching {job_id} ({self.last_error}): {res.stderr}")
+            return False
+        self.last_error = None
+        return True
+
+    def translate_resources(self, spec):
+        """ResourceSpec -> flag di `docker run`. Senza scheduler non c'è reservation di CPU:
+        si usa il limite (o la request come limite equivalente)."""
+        native = {}
+        notes = []
+        cpus = spec.cpu_limit if spec.cpu_limit is not None else spec.cpu
+        if cpus is not None:
+            native["cpus"] = cpus
+            if spec.cpu_limit is None:
+                notes.append("cpu request applied as --cpus limit (no scheduler)")
+        native["memory-reservation"] = f"{int(spec.memory_mb)}m"
+        if spec.memory_limit_mb is not None:
+            native["memory"] = f"{int(spec.memory_limit_mb)}m"
+        return translation("docker", spec, native, notes)
+
+    def enable_preemption(self):
+        return False
+
+    def restore_preemption(self):
+        return True
+
+    @profiled("get_nodes")
+    def get_nodes(self):
+        """Return [{name, cpus, memory_mb}] (il solo nodo del daemon docker)"""
+        res = self._run("docker info --format '{{json .}}'")
+        try:
+            info = json.loads(res.stdout)
+        except json.JSONDecodeError:
+            print(f"[DOCKER] Could not discover node: {res.stderr}")
+            return []
+        return [{
+            "name": self.host or socket.gethostname(),
+            "cpus": float(info["NCPU"]),
+            "memory_mb": info["MemTotal"] // 2**20
+        }]
+
+    @profiled("get_node_distribution")
+    def get_node_distribution(self):
+        """Return {name_node: number_job_running} (un solo nodo)"""
+        cmd = "docker ps -q --filter label=app=cob-job --filter status=running"
+        res = self._run(cmd)
+        running = [c for c in res.stdout.strip().split('\n') if c]
+        if not running:
+            return {}
+        node = self.host or socket.gethostname()
+        return {node: len(running)}
+
+    @profiled("get_task_history")
+    def get_task_history(self, job_id):
+        container_name = f"{self.name_prefix}_{job_id}"
+        cmd = f"docker ps -a --filter name={container_name} --format '{{{{.Status}}}}'"
+        res = self._run(cmd)
+        return res.stdout.strip().split('\n')
+
+    @profiled("clean_jobs")
+    def clean_jobs(self):
+        print(f"[DOCKER] Cleaning containers ({self.name_prefix})...")
+        cmd = "docker ps -aq --filter label=app=cob-job | xargs -r docker rm -f"
+        self._run(cmd)
+        time.sleep(1)
@@ -4,8 +4,34 @@ import json
 import collections
 import os
 
+from utils.metrics import metered_submit
+from utils.profiler import PROFILER, profiled
+from utils.resources import ResourceSpec, translation, translation_env
+from utils.submission import classify_error, VALIDATION
+
+
+def parse_cpu_quantity(value):
+    """Quantity CPU di K8s ("4", "3500m") -> core"""
+    value = str(value)
+    if value.endswith("m"):
+        return float(value[:-1]) / 1000
+    return float(value)
+
+
+def parse_memory_quantity(value):
+    """Quantity memoria di K8s ("16318080Ki", "2Gi", "512M", "1e9") -> MB"""
+    value = str(value)
+    units = {"Ki": 2**10, "Mi": 2**20, "Gi": 2**30, "Ti": 2**40, "k": 10**3, "M": 10**6, "G": 10**9, "T": 10**12}
+    for suffix in ("Ki", "Mi", "Gi", "Ti", "k", "M", "G", "T"):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * units[suffix] // 2**20)
+    return int(float(value) // 2**20)
+
 
 class K8sDriver:
+    # Priorità native tramite PriorityClass (preemption abilitata di default nello scheduler)
+    PRIORITY_SUPPORT = "native: PriorityClass (preemptionPolicy=PreemptLowerPriority)"
+
     def __init__(self, namespace="cob-job", image="192.168.15.9:5000/cob-job-worker:latest"):
         self.namespace = namespace
         self.image = image
@@ -13,12 +39,22 @@ class K8sDriver:
         self.host_path = "/srv/nfs/cob_results"
         # Percorso dentro il CONTAINER dove scrive il worker
         self.container_mount = "/mnt/results"
+        # Categoria dell'ultimo errore di submit (vedi utils/submission.py)
+        self.last_error = None
+        # Traduzione delle risorse dell'ultimo submit (vedi utils/resources.py)
+        self.last_resources = None
+        # PriorityClass già create in questa sessione
+        self._priority_classes = set()
 
-    def _run(self, cmd):
-        return subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    @profiled("subprocess", cat="spawn")
+    def _run(self, cmd, input_str=None):
+        return subprocess.run(cmd, input=input_str, shell=True, capture_output=True, text=True)
 
+    @profiled("submit_job")
+    @metered_submit
     def submit_job(self, job_id, job_type="cpu", duration=10, constraints=None, cpu_reservation=None,
-                   restart_policy="Never", command=None):
+                   restart_policy="Never", command=None, priority=None,
+                   gang_size=1, extra_env=None, resources=None):
         # I nomi in K8s devono essere minuscoli e senza caratteri strani
         safe_job_id = str(job_id).lower().replace("_", "-")
         job_name = f"{self.namespace}-{safe_job_id}"
@@ -36,6 +72,15 @@ class K8sDriver:
             else:
                 container_cmd = command.split()
 
+        # --- Risorse (requests/limits) ---
+        try:
+            spec = ResourceSpec.from_args(resources, cpu_reservation)
+        except (TypeError, ValueError) as e:
+            self.last_error = VALIDATION
+            print(f"[K8S] Invalid resources for {job_id}: {e}")
+            return False
+        self.last_resources = self.translate_resources(spec)
+
         # --- 2. Logica Recovery (BackoffLimit) ---
         # Se restart_policy NON è "none" o "never" (quindi è "on-failure" o simile),
         # alziamo il backoffLimit per permettere a K8s di riprovare.
@@ -61,6 +106,10 @@ class K8sDriver:
             },
             "spec": {
                 "backoffLimit": limit,  # 0 = Fail Fast, 4 = Recovery Enabled
+                # Gang: N pod paralleli, ciascuno con JOB_COMPLETION_INDEX (0..N-1)
+                "parallelism": gang_size,
+                "completions": gang_size,
+                "completionMode": "Indexed" if gang_size > 1 else "NonIndexed",
                 "ttlSecondsAfterFinished": 600,  # Pulizia automatica dopo 10 min
                 "template": {
                     "metadata": {
@@ -77,8 +126,12 @@ class K8sDriver:
                                 {"name": "JOB_ID", "value": str(job_id)},
                                 {"name": "JOB_TYPE", "value": str(job_type)},
                                 {"name": "DURATION", "value": str(duration)},
-                                {"name": "OUTPUT_DIR", "value": self.container_mount}
-                            ],
+                                {"name": "GANG_SIZE", "value": str(gang_size)},
+                                {"name": "OUTPUT_DIR", "value": self.container_mount},
+                                # Nome del nodo per il worker (downward API)
+                                {"name": "NODE_NAME", "valueFrom": {"fieldRef": {"fieldPath": "spec.nodeName"}}},
+                                {"name": "RESOURCES", "value": translation_env(self.last_resources)}
+                            ] + [{"name": key, "value": str(val)} for key, val in (extra_env or {}).items()],
                             "volumeMounts": [{
                                 "name": "results-vol",
                                 "mountPath": self.container_mount
@@ -96,27 +149,119 @@ class K8sDriver:
             }
         }
 
-        # Risorse
-        if cpu_reservation:
-            job_manifest["spec"]["template"]["spec"]["containers"][0]["resources"] = {
-                "requests": {"cpu": str(cpu_reservation)}
-            }
+        # Risorse: "requests.cpu" -> {"requests": {"cpu": ...}}
+        container_resources = {}
+        for key, val in self.last_resources["native"].items():
+            kind, name = key.split(".")
+            container_resources.setdefault(kind, {})[name] = val
+        job_manifest["spec"]["template"]["spec"]["containers"][0]["resources"] = container_resources
+
+        # Priorità (PriorityClass cluster-wide, creata al primo uso)
+        if priority is not None:
+            priority_class = self.ensure_priority_class(priority)
+            if priority_class is None:
+                return False
+            job_manifest["spec"]["template"]["spec"]["priorityClassName"] = priority_class
 
         # Node Selector (Constraints)
         if constraints:
             job_manifest["spec"]["template"]["spec"]["nodeSelector"] = constraints
 
         # Apply via stdin
-        manifest_str = json.dumps(job_manifest)
+        with PROFILER.span("json_encode", cat="driver"):
+            manifest_str = json.dumps(job_manifest)
         cmd = f"kubectl apply -f - -n {self.namespace}"
 
-        res = subprocess.run(cmd, input=manifest_str, shell=True, text=True, capture_output=True)
+        with PROFILER.span("subprocess", cat="spawn"):
+            res = subprocess.run(cmd, input=manifest_str, shell=True, text=True, capture_output=True)
 
         if res.returncode != 0:
-            print(f"[K8S] Error launching {job_id}: {res.stderr}")
+            self.last_error = classify_error(res.stderr)
+            print(f"[K8S] Error launching {job_id} ({self.last_error}): {res.stderr}")
             return False
+        self.last_error = None
         return True
 
+    def translate_resources(self, spec):
+        """ResourceSpec -> requests/limits del container (CPU in core, memoria in Mi)"""
+        native = {}
+        if spec.cpu is not None:
+            native["requests.cpu"] = f"{spec.cpu:g}"
+        native["requests.memory"] = f"{int(spec.memory_mb)}Mi"
+        if spec.cpu_limit is not None:
+            native["limits.cpu"] = f"{spec.cpu_limit:g}"
+        if spec.memory_limit_mb is not None:
+            native["limits.memory"] = f"{int(spec.memory_limit_mb)}Mi"
+        return translation("k8s", spec, native)
+
+    def ensure_priority_class(self, priority):
+        """Crea (se serve) la PriorityClass per il valore dato e ne ritorna il nome
+        (None se la creazione fallisce: last_error viene impostato)"""
+        name = f"{self.namespace}-priority-{int(priority)}"
+        if name in self._priority_classes:
+            return name
+        manifest = {
+            "apiVersion": "scheduling.k8s.io/v1",
+            "kind": "PriorityClass",
+            "metadata": {"name": name, "labels": {"app": "cob-job"}},
+            "value": int(priority),
+            "preemptionPolicy": "PreemptLowerPriority",
+            "globalDefault": False
+        }
+        res = self._run("kubectl apply -f -", input_str=json.dumps(manifest))
+        if res.returncode != 0:
+            self.last_error = classify_error(res.stderr)
+            print(f"[K8S] Error creating PriorityClass {name} ({self.last_error}): {res.stderr}")
+            return None
+        self._priority_classes.add(name)
+        return name
+
+    def enable_preemption(self):
+        """Nulla da fare: kube-scheduler prelaziona i pod a priorità inferiore per default"""
+        return True
+
+    def restore_preemption(self):
+        """Elimina le PriorityClass (cluster-wide) create da questo driver"""
+        ok = True
+        for name in sorted(self._priority_classes):
+            res = self._run(f"kubectl delete priorityclass {name} --ignore-not-found")
+            if res.returncode != 0:
+                print(f"[K8S] Could not delete PriorityClass {name}: {res.stderr}")
+                ok = False
+            else:
+                self._priority_classes.discard(name)
+        return ok
+
+    @profiled("get_nodes")
+    def get_nodes(self):
+        """Ritorna [{name, cpus, memory_mb}] dei nodi schedulabili (risorse allocatable)"""
+        res = self._run("kubectl get nodes -o json")
+        try:
+            data = json.loads(res.stdout)
+        except json.JSONDecodeError:
+            print(f"[K8S] Could not discover nodes: {res.stderr}")
+            return []
+
+        nodes = []
+        for node in data.get("items", []):
+            spec = node.get("spec", {})
+            if spec.get("unschedulable"):
+                continue
+            # Esclude i nodi con taint NoSchedule (es. control-plane): i job non ci finiscono
+            if any(t.get("effect") == "NoSchedule" for t in spec.get("taints", [])):
+                continue
+            conditions = {c["type"]: c["status"] for c in node["status"].get("conditions", [])}
+            if conditions.get("Ready") != "True":
+                continue
+            allocatable = node["status"]["allocatable"]
+            nodes.append({
+                "name": node["metadata"]["name"],
+                "cpus": parse_cpu_quantity(allocatable["cpu"]),
+                "memory_mb": parse_memory_quantity(allocatable["memory"])
+            })
+        return nodes
+
+    @profiled("get_node_distribution")
     def get_node_distribution(self):
         """Ritorna {nome_nodo: numero_pod_running}"""
         cmd = (f"kubectl get pods -n {self.namespace} "
@@ -127,6 +272,7 @@ class K8sDriver:
         nodes = res.stdout.strip().split()
         return dict(collections.Counter(nodes))
 
+    @profiled("get_pod_status_counts")
     def get_pod_status_counts(self):
         """Conta gli stati dei pod (Running, Pending, Error, etc)"""
         cmd = (f"kubectl get pods -n {self.namespace} "
@@ -139,6 +285,7 @@ class K8sDriver:
         statuses = [s for s in res.stdout.strip().split('\n') if s]
         return dict(collections.Counter(statuses))
 
+    @profiled("clean_jobs")
     def clean_jobs(self):
         print(f"[K8S] Cleaning jobs in namespace {self.namespace}...")
         cmd = f"kubectl delete jobs -l app=cob-job -n {self.namespace} --wait=false"
@@ -146,6 +293,7 @@ class K8sDriver:
         # Per sicurezza puliamo anche i pod orfani
         time.sleep(1)
 
+    @profiled("get_task_history")
     def get_task_history(self, job_id):
         """Ritorna le righe di stato dei pod per un job specifico"""
         cmd = f"kubectl get pods -n {self.namespace} -l job_id={job_id} --no-headers"
@@ -4,8 +4,16 @@ import json
 import collections
 import os
 
+from utils.metrics import metered_submit
+from utils.profiler import PROFILER, profiled
+from utils.resources import ResourceSpec, FALLBACK_CPU_MHZ, translation, translation_env
+from utils.submission import classify_error, VALIDATION
+
 
 class NomadDriver:
+    # Priorità native del job (1-100); la preemption dei job batch va abilitata nello scheduler
+    PRIORITY_SUPPORT = "native: job priority + preempt-batch-scheduler"
+
     def __init__(self, job_prefix="cob-job", image="192.168.15.9:5000/cob-job-worker:latest"):
         self.job_prefix = job_prefix
         self.image = image
@@ -13,12 +21,26 @@ class NomadDriver:
         self.host_path = "/srv/nfs/cob_results"
         self.container_mount = "/mnt/results"
         self.datacenters = ["dc1"]
+        # Categoria dell'ultimo errore di submit (vedi utils/submission.py)
+        self.last_error = None
+        # Traduzione delle risorse dell'ultimo submit (vedi utils/resources.py)
+        self.last_resources = None
+        # MHz per core scoperti dai nodi (cpu.frequency): risolti qui, prima di ogni fase
+        # misurata, così la scoperta non finisce nella latenza del primo submit_job
+        self._cpu_mhz = None
+        self.cpu_mhz_per_core()
+        # Valore di preempt-batch-scheduler prima di enable_preemption() (None = non modificato)
+        self._saved_batch_preemption = None
 
+    @profiled("subprocess", cat="spawn")
     def _run(self, cmd, input_str=None):
         return subprocess.run(cmd, input=input_str, shell=True, capture_output=True, text=True)
 
+    @profiled("submit_job")
+    @metered_submit
     def submit_job(self, job_id, job_type="cpu", duration=10, constraints=None, cpu_reservation=None,
-                   restart_policy="none", command=None):
+                   restart_policy="none", command=None, priority=None,
+                   gang_size=1, extra_env=None, resources=None):
         # Nomad ID non accetta underscore, meglio usare trattini
         safe_job_id = f"{self.job_prefix}-{job_id}".replace("_", "-")
 
@@ -34,13 +56,15 @@ class NomadDriver:
             "mode": "fail"
         }
 
-        # 2. Configurazione Risorse CPU
-        cpu_mhz = 100
-        if cpu_reservation:
-            try:
-                cpu_mhz = int(float(cpu_reservation) * 2000)
-            except:
-                pass
+        # 2. Configurazione Risorse (core -> MHz dalla frequenza reale dei nodi)
+        try:
+            spec = ResourceSpec.from_args(resources, cpu_reservation)
+        except (TypeError, ValueError) as e:
+            self.last_error = VALIDATION
+            print(f"[NOMAD] Invalid resources for {job_id}: {e}")
+            return False
+        self.last_resources = self.translate_resources(spec)
+        native = self.last_resources["native"]
 
         # 3. Configurazione Constraints (HCL Syntax)
         # HCL: constraint { attribute = ... value = ... }
@@ -63,6 +87,8 @@ class NomadDriver:
                 "readonly": False
             }]
         }
+        if native.get("cpu_hard_limit"):
+            docker_config["cpu_hard_limit"] = True
 
         if command:
             if "sh -c" in command:
@@ -81,10 +107,12 @@ class NomadDriver:
                 safe_job_id: {
                     "id": safe_job_id,
                     "type": "batch",
+                    "priority": self._nomad_priority(priority),
                     "datacenters": self.datacenters,
                     "group": {
                         "worker-group": {
-                            "count": 1,
+                            # Gang: N task nello stesso gruppo (indice in NOMAD_ALLOC_INDEX)
+                            "count": gang_size,
                             "restart": restart_stanza,
                             "constraint": nomad_constraints,
                             "task": {
@@ -95,12 +123,15 @@ class NomadDriver:
                                         "JOB_ID": str(job_id),
                                         "JOB_TYPE": str(job_type),
                                         "DURATION": str(duration),
-                                        "OUTPUT_DIR": self.container_mount
+                                        "GANG_SIZE": str(gang_size),
+                                        "OUTPUT_DIR": self.container_mount,
+                                        # Interpolato da Nomad con il nome del nodo client
+                                        "NODE_NAME": "${node.unique.name}",
+                                        "RESOURCES": translation_env(self.last_resources),
+                                        **{key: str(val) for key, val in (extra_env or {}).items()}
                                     },
-                                    "resources": {
-                                        "cpu": cpu_mhz,
-                                        "memory": 256
-                                    }
+                                    "resources": {key: native[key] for key in ("cpu", "memory", "memory_max")
+                                                  if key in native}
                                 }
                             }
                         }
@@ -110,15 +141,136 @@ class NomadDriver:
         }
 
         # Invio a Nomad via CLI
-        json_str = json.dumps(job_spec)
+        with PROFILER.span("json_encode", cat="driver"):
+            json_str = json.dumps(job_spec)
         cmd = "nomad job run -detach -"
         res = self._run(cmd, input_str=json_str)
 
         if res.returncode != 0:
-            print(f"[NOMAD] Error launching {job_id}: {res.stderr}")
+            self.last_error = classify_error(res.stderr)
+            print(f"[NOMAD] Error launching {job_id} ({self.last_error}): {res.stderr}")
             return False
+        self.last_error = None
         return True
 
+    def cpu_mhz_per_core(self):
+        """MHz di un core: la frequenza più bassa tra i nodi, così 1 core richiesto entra su
+        qualunque nodo. Ritorna (mhz, nota sulla provenienza)."""
+        if self._cpu_mhz is None:
+            freqs = sorted(n["cpu_mhz"] for n in self.get_nodes() if n.get("cpu_mhz"))
+            if not freqs:
+                self._cpu_mhz = (FALLBACK_CPU_MHZ, f"node discovery failed: fallback {FALLBACK_CPU_MHZ} MHz/core")
+            elif freqs[0] != freqs[-1]:
+                self._cpu_mhz = (freqs[0], f"heterogeneous nodes ({freqs[0]:g}-{freqs[-1]:g} MHz/core): using the slowest")
+            else:
+                self._cpu_mhz = (freqs[0], f"cpu.frequency {freqs[0]:g} MHz/core")
+        return self._cpu_mhz
+
+    def translate_resources(self, spec):
+        """ResourceSpec -> stanza resources di Nomad (cpu in MHz, memory e memory_max in MB)"""
+        notes = []
+        native = {}
+        if spec.cpu is None:
+            native["cpu"] = 100
+            notes.append("no cpu request: Nomad default 100 MHz")
+        else:
+            mhz, source = self.cpu_mhz_per_core()
+            native["cpu"] = int(round(spec.cpu * mhz))
+            notes.append(source)
+        if spec.cpu_limit is not None:
+            if spec.cpu_limit == spec.cpu:
+                # Con cpu_hard_limit la share in MHz diventa anche il tetto (CFS quota)
+                native["cpu_hard_limit"] = True
+            else:
+                notes.append("cpu_limit differs from cpu: Nomad has a single CPU value, limit not enforced")
+        # In Nomad memory è sia request che limite, a meno di memory_max (oversubscription)
+        native["memory"] = int(spec.memory_mb)
+        if spec.memory_limit_mb is not None:
+            native["memory_max"] = int(spec.memory_limit_mb)
+            notes.append("memory_max requires memory oversubscription enabled in the scheduler")
+        return translation("nomad", spec, native, notes)
+
+    @staticmethod
+    def _nomad_priority(priority):
+        # Nomad accetta 1-100 (default 50)
+        if priority is None:
+            return 50
+        return max(1, min(100, int(priority)))
+
+    def enable_preemption(self):
+        """Abilita la preemption per i job batch (disabilitata di default in Nomad).
+        Il valore precedente viene salvato e rimesso da restore_preemption()."""
+        res = self._run("nomad operator scheduler get-config -json")
+        try:
+            data = json.loads(res.stdout)
+            config = data.get("SchedulerConfig", data)
+            previous = bool(config["PreemptionConfig"]["BatchSchedulerEnabled"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            print(f"[NOMAD] Could not read the scheduler configuration: {res.stderr}")
+            return False
+        if previous:
+            return True
+
+        res = self._run("nomad operator scheduler set-config -preempt-batch-scheduler=true")
+        if res.returncode != 0:
+            print(f"[NOMAD] Could not enable batch preemption: {res.stderr}")
+            return False
+        self._saved_batch_preemption = previous
+        return True
+
+    def restore_preemption(self):
+        """Rimette preempt-batch-scheduler com'era prima di enable_preemption()"""
+        if self._saved_batch_preemption is None:
+            return True
+        value = str(self._saved_batch_preemption).lower()
+        res = self._run(f"nomad operator scheduler set-config -preempt-batch-scheduler={value}")
+        if res.returncode != 0:
+            print(f"[NOMAD] Could not restore batch preemption ({value}): {res.stderr}")
+            return False
+        self._saved_batch_preemption = None
+        return True
+
+    @profiled("get_nodes")
+    def get_nodes(self):
+        """Ritorna [{name, cpus, memory_mb, cpu_mhz, cpu_total_mhz}] dei nodi client pronti ed eleggibili"""
+        res = self._run("nomad node status -json")
+        try:
+            stubs = json.loads(res.stdout)
+        except json.JSONDecodeError:
+            print(f"[NOMAD] Could not discover nodes: {res.stderr}")
+            return []
+
+        nodes = []
+        for stub in stubs:
+            if stub["Status"] != "ready" or stub.get("SchedulingEligibility") != "eligible" or stub.get("Drain"):
+                continue
+            # Il dettaglio (attributi e risorse) è solo nella vista del singolo nodo
+            node_res = self._run(f"nomad node status -json {stub['ID']}")
+            try:
+                node = json.loads(node_res.stdout)
+            except json.JSONDecodeError:
+                print(f"[NOMAD] Could not inspect node {stub['Name']}: {node_res.stderr}")
+                continue
+            attrs = node.get("Attributes", {})
+            resources = node.get("NodeResources", {})
+            cores = float(attrs.get("cpu.numcores", 0))
+            # Frequenza per core; in mancanza, compute totale / numero di core
+            if attrs.get("cpu.frequency"):
+                cpu_mhz = float(attrs["cpu.frequency"])
+            elif attrs.get("cpu.totalcompute") and cores:
+                cpu_mhz = float(attrs["cpu.totalcompute"]) / cores
+            else:
+                cpu_mhz = None
+            nodes.append({
+                "name": node["Name"],
+                "cpus": cores,
+                "memory_mb": resources.get("Memory", {}).get("MemoryMB") or int(attrs.get("memory.totalbytes", 0)) // 2**20,
+                "cpu_mhz": cpu_mhz,
+                "cpu_total_mhz": resources.get("Cpu", {}).get("CpuShares")
+            })
+        return nodes
+
+    @profiled("get_node_distribution")
     def get_node_distribution(self):
         """Ritorna {nome_nodo: numero_allocazioni_running}"""
         cmd = f"nomad job status -short | grep {self.job_prefix} | awk '{{print $1}}'"
@@ -142,12 +294,14 @@ class NomadDriver:
 
         return dict(node_counts)
 
+    @profiled("clean_jobs")
     def clean_jobs(self):
         print(f"[NOMAD] Cleaning jobs starting with {self.job_prefix}...")
         cmd = f"nomad job status -short | grep {self.job_prefix} | awk '{{print $1}}' | xargs -r nomad job stop -purge"
         self._run(cmd)
         time.sleep(2)
 
+    @profiled("get_task_history")
     def get_task_history(self, job_id):
         """Ritorna lo stato delle allocazioni per un dato job"""
         safe_job_id = f"{self.job_prefix}-{job_id}".replace("_", "-")
@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import socket
+import random
+import threading
+import collections
+
+from utils.metrics import metered_submit
+from utils.profiler import profiled
+from utils.resources import ResourceSpec, translation
+from utils.submission import VALIDATION
+from utils.results import result_path
+
+
+class StubDriver:
+    """Driver finto senza orchestratore: simula la latenza dell'API di submit e, se richiesto,
+    scrive il file risultato come farebbe il worker. Serve a provare l'harness (e il
+    generatore di carico distribuito) su una sola macchina senza cluster."""
+
+    PRIORITY_SUPPORT = "none: stub driver"
+
+    def __init__(self, submit_latency=0.005, jitter=0.002, results_dir=None, start_delay=0.5):
+        self.submit_latency = submit_latency
+        self.jitter = jitter
+        # Se impostato, ogni job "parte" dopo start_delay e scrive {job_id}.json qui
+        self.results_dir = results_dir
+        self.start_delay = start_delay
+        self.last_error = None
+        self.last_resources = None
+        self._running = collections.Counter()
+
+    @profiled("submit_job")
+    @metered_submit
+    def submit_job(self, job_id, job_type="cpu", duration=10, constraints=None, cpu_reservation=None,
+                   restart_policy="none", command=None, priority=None,
+                   gang_size=1, extra_env=None, resources=None):
+        try:
+            spec = ResourceSpec.from_args(resources, cpu_reservation)
+        except (TypeError, ValueError) as e:
+            self.last_error = VALIDATION
+            print(f"[STUB] Invalid resources for {job_id}: {e}")
+            return False
+        self.last_resources = self.translate_resources(spec)
+        time.sleep(max(self.submit_latency + random.uniform(-self.jitter, self.jitter), 0.0))
+        if self.results_dir:
+            run_id = (extra_env or {}).get("RUN_ID")
+            threading.Timer(self.start_delay, self._fake_worker,
+                            args=(job_id, job_type, float(duration), run_id)).start()
+        self.last_error = None
+        return True
+
+    def _fake_worker(self, job_id, job_type, duration, run_id=None):
+        node = socket.gethostname()
+        self._running[node] += 1
+        start_ts = time.time()
+        time.sleep(duration)
+        end_ts = time.time()
+        self._running[node] -= 1
+        result = {
+            "job_id": job_id,
+            "node": node,
+            "status": "completed",
+            "job_type": job_type,
+            "start_ts": start_ts,
+            "end_ts": end_ts,
+            "duration_target": duration,
+            "duration_real": end_ts - start_ts,
+            "error": None
+        }
+        if run_id:
+            # Stesso layout sharded del worker
+            path = result_path(self.results_dir, run_id, job_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        else:
+            path = os.path.join(self.results_dir, f"{job_id}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(result, f)
+        os.replace(path + ".tmp", path)
+
+    def translate_resources(self, spec):
+        return translation("stub", spec, {}, ["not enforced: stub driver"])
+
+    def enable_preemption(self):
+        return False
+
+    def restore_preemption(self):
+        return True
+
+    def get_nodes(self):
+        return [{"name": socket.gethostname(), "cpus": float(os.cpu_count() or 1), "memory_mb": None}]
+
+    def get_node_distribution(self):
+        return {node: n for node, n in self._running.items() if n > 0}
+
+    def get_task_history(self, job_id):
+        return []
+
+    def clean_jobs(self):
+        print("[STUB] Nothing to clean.")
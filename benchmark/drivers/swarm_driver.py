@@ -3,18 +3,34 @@ import time
 import json
 import collections
 
+from utils.metrics import metered_submit
+from utils.profiler import profiled
+from utils.resources import ResourceSpec, translation, translation_env
+from utils.submission import classify_error, VALIDATION
+
 
 class SwarmDriver:
+    # Swarm non ha priorità né preemption: la priorità viene solo registrata come label del servizio
+    PRIORITY_SUPPORT = "none: recorded as service label only, no preemption"
+
     def __init__(self, stack_name="cob-job", image="192.168.15.9:5000/cob-job-worker:latest"):
         self.stack_name = stack_name
         self.image = image
         self.nfs_mount = "type=bind,source=/srv/nfs/cob_results,target=/mnt/results"
+        # Categoria dell'ultimo errore di submit (vedi utils/submission.py)
+        self.last_error = None
+        # Traduzione delle risorse dell'ultimo submit (vedi utils/resources.py)
+        self.last_resources = None
 
+    @profiled("subprocess", cat="spawn")
     def _run(self, cmd):
         return subprocess.run(cmd, shell=True, capture_output=True, text=True)
 
+    @profiled("submit_job")
+    @metered_submit
     def submit_job(self, job_id, job_type="cpu", duration=10, constraints=None, cpu_reservation=None,
-                   restart_policy="none", command=None):
+                   restart_policy="none", command=None, priority=None,
+                   gang_size=1, extra_env=None, resources=None):
         service_name = f"{self.stack_name}_{job_id}"
 
         args = ""
@@ -22,8 +38,29 @@ class SwarmDriver:
             for key, val in constraints.items():
                 args += f" --constraint node.labels.{key}=={val}"
 
-        if cpu_reservation:
-            args += f" --reserve-cpu {cpu_reservation}"
+        try:
+            spec = ResourceSpec.from_args(resources, cpu_reservation)
+        except (TypeError, ValueError) as e:
+            self.last_error = VALIDATION
+            print(f"[SWARM] Invalid resources for {job_id}: {e}")
+            return False
+        self.last_resources = self.translate_resources(spec)
+        for flag, val in self.last_resources["native"].items():
+            args += f" --{flag} {val}"
+
+        if priority is not None:
+            args += f" --label cob.priority={priority}"
+
+        # Gang: replicated-job con tutte le repliche avviabili insieme.
+        # Swarm assegna lo slot (1..N) a ogni task: lo passiamo al worker come indice del membro.
+        if gang_size > 1:
+            mode_args = (f"--mode replicated-job --replicas {gang_size} --max-concurrent {gang_size} "
+                         f"--env GANG_SIZE={gang_size} --env GANG_MEMBER={{{{.Task.Slot}}}} ")
+        else:
+            mode_args = "--replicas 1 "
+
+        # Variabili aggiuntive per il worker (es. THREADS/PROCS dei job 'parallel')
+        env_args = "".join(f"--env {key}={val} " for key, val in (extra_env or {}).items())
 
         final_cmd = ""
         if command:
@@ -33,11 +70,14 @@ class SwarmDriver:
             f"docker service create "
             f"--detach "
             f"--name {service_name} "
-            f"--replicas 1 "
+            f"{mode_args}"
             f"--restart-condition {restart_policy} "
             f"--env JOB_ID={job_id} "
             f"--env JOB_TYPE={job_type} "
             f"--env DURATION={duration} "
+            f"--env NODE_NAME={{{{.Node.Hostname}}}} "
+            f"--env RESOURCES={translation_env(self.last_resources)} "
+            f"{env_args}"
             f"--mount {self.nfs_mount} "
             f"{args} "
             f"{self.image}"  
@@ -46,10 +86,56 @@ class SwarmDriver:
 
         res = self._run(cmd)
         if res.returncode != 0:
-            print(f"[SWARM] Error launching {job_id}: {res.stderr}")
+            self.last_error = classify_error(res.stderr)
+            print(f"[SWARM] Error launching {job_id} ({self.last_error}): {res.stderr}")
             return False
+        self.last_error = None
         return True
 
+    def translate_resources(self, spec):
+        """ResourceSpec -> flag di `docker service create` (reservation per lo scheduler, limit a runtime)"""
+        native = {}
+        if spec.cpu is not None:
+            native["reserve-cpu"] = spec.cpu
+        native["reserve-memory"] = f"{int(spec.memory_mb)}M"
+        if spec.cpu_limit is not None:
+            native["limit-cpu"] = spec.cpu_limit
+        if spec.memory_limit_mb is not None:
+            native["limit-memory"] = f"{int(spec.memory_limit_mb)}M"
+        notes = ["reservations are only used for placement; limits are enforced by the container runtime"]
+        return translation("swarm", spec, native, notes)
+
+    def enable_preemption(self):
+        """Swarm non supporta la preemption"""
+        print("[SWARM] Preemption is not supported: priority is only recorded as a label.")
+        return False
+
+    def restore_preemption(self):
+        return True
+
+    @profiled("get_nodes")
+    def get_nodes(self):
+        """Return [{name, cpus, memory_mb}] for the nodes that can run tasks"""
+        res = self._run("docker node ls -q | xargs -r docker node inspect")
+        try:
+            data = json.loads(res.stdout)
+        except json.JSONDecodeError:
+            print(f"[SWARM] Could not discover nodes: {res.stderr}")
+            return []
+
+        nodes = []
+        for node in data:
+            if node["Status"]["State"] != "ready" or node["Spec"].get("Availability") != "active":
+                continue
+            resources = node["Description"]["Resources"]
+            nodes.append({
+                "name": node["Description"]["Hostname"],
+                "cpus": resources["NanoCPUs"] / 1e9,
+                "memory_mb": resources["MemoryBytes"] // 2**20
+            })
+        return nodes
+
+    @profiled("get_node_distribution")
     def get_node_distribution(self):
         """Return {name_node: number_job_running}"""
         # Retrieve only task actived
@@ -64,6 +150,7 @@ class SwarmDriver:
         nodes = [n for n in nodes if n]
         return dict(collections.Counter(nodes))
 
+    @profiled("get_task_history")
     def get_task_history(self, job_id):
         """Return {task_name: task_history}"""
         service_name = f"{self.stack_name}_{job_id}"
@@ -73,6 +160,7 @@ class SwarmDriver:
         res = self._run(cmd)
         return res.stdout.strip().split('\n')
 
+    @profiled("clean_jobs")
     def clean_jobs(self):
         print(f"[SWARM] Cleaning services ({self.stack_name})...")
         cmd = f"docker service ls --filter name={self.stack_name} -q | xargs -r docker service rm"
@@ -0,0 +1,141 @@
+import sys
+import os
+import time
+import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from utils.metrics import METRICS
+from utils.profiler import PROFILER
+from utils.submission import SubmissionManager, RetryPolicy
+
+# Rate di submit target (job/s) provati in sequenza, JOBS_PER_STEP job per step
+SUBMIT_RATES = [1, 2, 5, 10, 20, 50, 100]
+JOBS_PER_STEP = 50
+JOB_DURATION = 1
+RETRY_POLICY = RetryPolicy(max_retries=5, base_delay=0.2, max_delay=10.0)
+# Sopra questa rejection rate (o con retry) consideriamo che il control plane stia "spingendo indietro"
+PUSHBACK_THRESHOLD = 0.01
+# Thread che eseguono submit e retry: il loop di pacing non aspetta mai un backoff
+SUBMIT_WORKERS = 16
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/admission.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/admission_trace.json")
+
+
+def lag_summary(lags):
+    arr = np.array(lags)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 4),
+        "p99": round(float(np.percentile(arr, 99)), 4),
+        "max": round(float(arr.max()), 4)
+    }
+
+
+def run_step(driver, rate, step_idx):
+    """Sottomette JOBS_PER_STEP job a `rate` job/s (open loop) e ritorna le statistiche di ammissione"""
+    submitter = SubmissionManager(driver, RETRY_POLICY)
+    interval = 1.0 / rate
+    start = time.perf_counter()
+
+    with PROFILER.span("submit", cat="phase", rate=rate):
+        with ThreadPoolExecutor(max_workers=SUBMIT_WORKERS) as pool:
+            for i in range(JOBS_PER_STEP):
+                # Pacing su orario assoluto; submit e backoff girano nel pool, quindi un job
+                # throttled non ritarda gli arrivi successivi
+                target = start + i * interval
+                delay = target - time.perf_counter()
+                if delay > 0:
+                    PROFILER.sleep(delay, name="pacing")
+                pool.submit(submitter.submit, job_id=f"adm-{step_idx}-{i}", scheduled=target,
+                            job_type="sleep", duration=JOB_DURATION)
+
+    stats = submitter.stats()
+    stats["target_rate"] = rate
+    # Rate offerto reale: dai primi tentativi effettivi, non dagli orari previsti
+    stats["offered_rate"] = round(JOBS_PER_STEP / (max(submitter.first_attempts) - start + interval), 4)
+    # Ritardo del primo tentativo rispetto all'orario di arrivo: se supera l'intervallo
+    # il carico non è più open loop (driver lento o pool saturo)
+    stats["schedule_lag_seconds"] = lag_summary(submitter.schedule_lags)
+    stats["open_loop_violated"] = stats["schedule_lag_seconds"]["p99"] > interval
+    return stats
+
+
+def run_test():
+    print(f"--- TEST: SUBMISSION ADMISSION UNDER BURST (rates {SUBMIT_RATES} jobs/s) ---")
+
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        os.system(f"rm -f {RESULTS_DIR}/*.json")
+
+    METRICS.start("nomad", "submission_admission")
+
+    steps = []
+    pushback_rate = None
+    for step_idx, rate in enumerate(SUBMIT_RATES):
+        print(f"[TEST] Step {step_idx}: {JOBS_PER_STEP} jobs at {rate} jobs/s...")
+        stats = run_step(driver, rate, step_idx)
+        steps.append(stats)
+        print(f"   offered={stats['offered_rate']:.2f}/s admitted={stats['effective_admission_rate']}/s "
+              f"rejected={stats['rejection_rate']:.2%} retries={stats['total_retries']} "
+              f"lag p99={stats['schedule_lag_seconds']['p99']:.3f}s")
+        if stats["open_loop_violated"]:
+            print(f"   [WARNING] Arrivals fell behind schedule (p99 lag > {1.0 / rate:.3f}s): "
+                  f"the offered rate is lower than the target")
+
+        if pushback_rate is None and (stats["rejection_rate"] > PUSHBACK_THRESHOLD or stats["total_retries"] > 0):
+            pushback_rate = rate
+            print(f"   [!] Control plane started pushing back at {rate} jobs/s")
+
+        # Svuota il cluster tra uno step e l'altro per non misurare la saturazione delle risorse
+        with PROFILER.span("clean", cat="phase"):
+            driver.clean_jobs()
+
+    print("\n--- RESULTS ---")
+    if pushback_rate is None:
+        print(f"No pushback observed up to {SUBMIT_RATES[-1]} jobs/s")
+    else:
+        print(f"Pushback starts at: {pushback_rate} jobs/s")
+
+    output_data = {
+        "test_name": "submission_admission",
+        "orchestrator": "nomad",
+        "parameters": {
+            "submit_rates": SUBMIT_RATES,
+            "jobs_per_step": JOBS_PER_STEP,
+            "job_duration": JOB_DURATION,
+            "pushback_threshold": PUSHBACK_THRESHOLD,
+            "submit_workers": SUBMIT_WORKERS,
+            "retry_policy": RETRY_POLICY.as_dict()
+        },
+        "results": {
+            "pushback_rate_jobs_per_sec": pushback_rate,
+            "steps": steps
+        },
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    METRICS.stop()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
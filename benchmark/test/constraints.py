@@ -1,7 +1,6 @@
 import sys
 import os
 import time
-import glob
 import json
 
 # Setup path
@@ -12,20 +11,15 @@ sys.path.append(parent_dir)
 #from drivers.swarm_driver import SwarmDriver
 #from drivers.k8s_driver import K8sDriver
 from drivers.nomad_driver import NomadDriver
+from utils.profiler import PROFILER
+from utils.results import ResultAggregator, clean_runs, list_results
+from utils.warehouse import new_run_id
 
 RESULTS_DIR = "/srv/nfs/cob_results"
 NUM_GPU_JOBS = 3
 NUM_CPU_JOBS = 3
 JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/placement_constraints.json")
-
-
-def check_placement(file_path):
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return data.get("node", "unknown"), data.get("job_id", "unknown")
-    except Exception as e:
-        return "error", "error"
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/placement_constraints_trace.json")
 
 
 def run_test():
@@ -35,39 +29,49 @@ def run_test():
     driver = NomadDriver()
 
 
-    driver.clean_jobs()
-    os.system(f"rm -f {RESULTS_DIR}/*.json")
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        os.system(f"rm -f {RESULTS_DIR}/*.json")
+        clean_runs(RESULTS_DIR)
+
+    # Risultati sharded in {RESULTS_DIR}/{run_id}/{shard}/ (vedi utils/results.py)
+    run_id = new_run_id("nomad", "placement_constraints")
 
     print("[TEST] Launching Mixed Workload...")
 
-    # Launch GPU Jobs
-    for i in range(NUM_GPU_JOBS):
-        driver.submit_job(job_id=f"job-gpu-{i}",
-                          job_type="sleep",
-                          duration=5,
-                          constraints={"type": "gpu"}
-                          #constraints={"hardware": "gpu"}
-                          )
-
-    # Launch CPU Jobs
-    for i in range(NUM_CPU_JOBS):
-        driver.submit_job(job_id=f"job-cpu-{i}",
-                          job_type="sleep",
-                          duration=5,
-                          constraints={"type": "cpu"}
-                          #constraints={"hardware": "cpu"}
-                          )
+    with PROFILER.span("submit", cat="phase"):
+        # Launch GPU Jobs
+        for i in range(NUM_GPU_JOBS):
+            driver.submit_job(job_id=f"job-gpu-{i}",
+                              job_type="sleep",
+                              duration=5,
+                              constraints={"type": "gpu"},
+                              extra_env={"RUN_ID": run_id}
+                              #constraints={"hardware": "gpu"}
+                              )
+
+        # Launch CPU Jobs
+        for i in range(NUM_CPU_JOBS):
+            driver.submit_job(job_id=f"job-cpu-{i}",
+                              job_type="sleep",
+                              duration=5,
+                              constraints={"type": "cpu"},
+                              extra_env={"RUN_ID": run_id}
+                              #constraints={"hardware": "cpu"}
+                              )
 
     # Wait
     expected_files = NUM_GPU_JOBS + NUM_CPU_JOBS
     print(f"[TEST] Waiting for {expected_files} results...")
 
-    while True:
-        files = glob.glob(f"{RESULTS_DIR}/*.json")
-        if len(files) >= expected_files:
-            break
-        print(f"\rStatus: {len(files)}/{expected_files} finished...", end="")
-        time.sleep(2)
+    with PROFILER.span("poll", cat="phase"):
+        while True:
+            with PROFILER.span("glob", cat="collect"):
+                files = list_results(RESULTS_DIR, run_id, prefix="job-")
+            if len(files) >= expected_files:
+                break
+            print(f"\rStatus: {len(files)}/{expected_files} finished...", end="")
+            PROFILER.sleep(2)
 
     print("\n[TEST] All jobs finished. Analyzing placement...")
 
@@ -77,21 +81,23 @@ def run_test():
     errors = 0
 
     #Check nodes
-    for i in range(NUM_GPU_JOBS):
-        fpath = os.path.join(RESULTS_DIR, f"job-gpu-{i}.json")
-        if os.path.exists(fpath):
-            node, _ = check_placement(fpath)
-            gpu_nodes_used.add(node)
-        else:
-            errors += 1
-
-    for i in range(NUM_CPU_JOBS):
-        fpath = os.path.join(RESULTS_DIR, f"job-cpu-{i}.json")
-        if os.path.exists(fpath):
-            node, _ = check_placement(fpath)
-            cpu_nodes_used.add(node)
-        else:
-            errors += 1
+    with PROFILER.span("collect", cat="phase"):
+        rows = ResultAggregator(RESULTS_DIR, run_id).aggregate(prefix="job-")
+        nodes_by_job = {job_id.decode(): node.decode() for job_id, node in zip(rows["job_id"], rows["node"])}
+
+        for i in range(NUM_GPU_JOBS):
+            node = nodes_by_job.get(f"job-gpu-{i}")
+            if node is not None:
+                gpu_nodes_used.add(node)
+            else:
+                errors += 1
+
+        for i in range(NUM_CPU_JOBS):
+            node = nodes_by_job.get(f"job-cpu-{i}")
+            if node is not None:
+                cpu_nodes_used.add(node)
+            else:
+                errors += 1
 
     intersection = gpu_nodes_used.intersection(cpu_nodes_used)
 
@@ -105,6 +111,7 @@ def run_test():
     output_data = {
         "test_name": "placement_constraints",
         "orchestrator": "nomad",
+        "run_id": run_id,
         "parameters": {
             "gpu_jobs": NUM_GPU_JOBS,
             "cpu_jobs": NUM_CPU_JOBS
@@ -115,7 +122,8 @@ def run_test():
             "cpu_nodes_used": list(cpu_nodes_used),
             "errors": errors,
             "overlap_detected": len(intersection) > 0
-        }
+        },
+        "harness_overhead": PROFILER.overhead_summary()
     }
 
     os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
@@ -124,7 +132,9 @@ def run_test():
 
     print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
 
-    driver.clean_jobs()
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
 
 
 if __name__ == "__main__":
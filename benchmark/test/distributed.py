@@ -0,0 +1,127 @@
+import sys
+import os
+import time
+import glob
+import json
+import numpy as np
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from utils.loadgen import LoadCoordinator, make_driver
+from utils.profiler import PROFILER
+
+# Driver usato da ogni agent: "swarm", "k8s", "nomad", "docker" o "stub" (nessun cluster)
+DRIVER = "nomad"
+DRIVER_ARGS = {}
+NUM_JOBS = 200
+JOB_DURATION = 5
+LOCAL_AGENTS = 4
+# Agent remoti: avviarli su ogni host con `python utils/loadgen.py agent --coordinator <ip>:<port>`
+REMOTE_AGENTS = 0
+COORDINATOR_PORT = 9300
+COMPLETION_TIMEOUT = 600
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, f"results/{DRIVER}/distributed_load.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, f"results/{DRIVER}/distributed_load_trace.json")
+# Lo stub non ha worker: i risultati finti li scrive il driver, nella directory letta dal test
+if DRIVER == "stub":
+    DRIVER_ARGS = dict(DRIVER_ARGS, results_dir=RESULTS_DIR)
+
+
+def run_test():
+    total_agents = LOCAL_AGENTS + REMOTE_AGENTS
+    print(f"--- TEST: DISTRIBUTED LOAD ({NUM_JOBS} Jobs, {total_agents} agents, driver {DRIVER}) ---")
+
+    driver = make_driver(DRIVER, DRIVER_ARGS)
+    # Senza cluster la directory condivisa (NFS) potrebbe non esistere
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        os.system(f"rm -f {RESULTS_DIR}/*.json")
+
+    jobs = [{"job_id": f"dist-{i}", "job_type": "sleep", "duration": JOB_DURATION} for i in range(NUM_JOBS)]
+
+    coordinator = LoadCoordinator(DRIVER, DRIVER_ARGS, local_agents=LOCAL_AGENTS, remote_agents=REMOTE_AGENTS,
+                                  port=COORDINATOR_PORT)
+    with PROFILER.span("submit", cat="phase"):
+        records = coordinator.run(jobs)
+
+    accepted = [r for r in records if r["ok"]]
+    print(f"[TEST] {len(accepted)}/{NUM_JOBS} jobs accepted. Waiting for completion...")
+
+    deadline = time.time() + COMPLETION_TIMEOUT
+    with PROFILER.span("poll", cat="phase"):
+        while time.time() < deadline:
+            files = glob.glob(f"{RESULTS_DIR}/dist-*.json")
+            print(f"\rStatus: {len(files)}/{len(accepted)} finished...", end="")
+            if len(files) >= len(accepted):
+                break
+            PROFILER.sleep(1)
+    print()
+
+    with PROFILER.span("collect", cat="phase"):
+        start_ts = {}
+        end_ts = []
+        for fpath in glob.glob(f"{RESULTS_DIR}/dist-*.json"):
+            with open(fpath, 'r') as f:
+                data = json.load(f)
+            start_ts[data["job_id"]] = data["start_ts"]
+            end_ts.append(data["end_ts"])
+
+    with PROFILER.span("analyze", cat="phase"):
+        submit_latency = np.array([r["ack_ts"] - r["submit_ts"] for r in records])
+        first_submit = min(r["submit_ts"] for r in records)
+        last_ack = max(r["ack_ts"] for r in records)
+        submit_window = last_ack - first_submit
+        offered_rate = len(records) / submit_window if submit_window > 0 else None
+        start_latency = np.array([start_ts[r["job_id"]] - r["submit_ts"] for r in accepted if r["job_id"] in start_ts])
+        makespan = (max(end_ts) - first_submit) if end_ts else None
+
+    print("\n--- RESULTS ---")
+    if offered_rate:
+        print(f"Aggregate submit rate: {offered_rate:.2f} jobs/sec over {submit_window:.2f}s")
+    print(f"Submit call latency p50/p99: {np.percentile(submit_latency, 50):.4f}s / "
+          f"{np.percentile(submit_latency, 99):.4f}s")
+    if len(start_latency):
+        print(f"Start latency p50/p99: {np.percentile(start_latency, 50):.2f}s / {np.percentile(start_latency, 99):.2f}s")
+
+    output_data = {
+        "test_name": "distributed_load",
+        "orchestrator": DRIVER,
+        "parameters": {
+            "num_jobs": NUM_JOBS,
+            "job_duration": JOB_DURATION,
+            "local_agents": LOCAL_AGENTS,
+            "remote_agents": REMOTE_AGENTS
+        },
+        "results": {
+            "accepted": len(accepted),
+            "rejected": len(records) - len(accepted),
+            "submit_window_seconds": round(submit_window, 4),
+            "aggregate_submit_rate": round(offered_rate, 4) if offered_rate else None,
+            "submit_latency_p50": round(float(np.percentile(submit_latency, 50)), 4),
+            "submit_latency_p99": round(float(np.percentile(submit_latency, 99)), 4),
+            "start_latency_p50": round(float(np.percentile(start_latency, 50)), 4) if len(start_latency) else None,
+            "start_latency_p99": round(float(np.percentile(start_latency, 99)), 4) if len(start_latency) else None,
+            "total_makespan_seconds": round(makespan, 4) if makespan else None,
+            "agents": coordinator.agent_stats()
+        },
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
@@ -9,6 +9,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 #from drivers.swarm_driver import SwarmDriver
 #from drivers.k8s_driver import K8sDriver
 from drivers.nomad_driver import NomadDriver
+from utils.profiler import PROFILER
 
 
 def run_test():
@@ -16,28 +17,31 @@ def run_test():
     #driver = K8sDriver()
     driver = NomadDriver()
 
-    driver.clean_jobs()
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
 
-    # Abbiamo 3 nodi x 4 CPU = 12 CPU Totali.
-    NUM_JOBS = 12
+    # Un job da 1 CPU per ogni CPU scoperta sui nodi (es. 3 nodi x 4 CPU = 12 job)
+    NUM_JOBS = int(sum(n["cpus"] for n in driver.get_nodes())) or 12
     CPU_REQ = "1.0"
 
     print(f"--- TEST: PARALLELISM & FAIRNESS ({NUM_JOBS} Jobs on Cluster) ---")
 
     print("[TEST] Submitting jobs...")
-    for i in range(NUM_JOBS):
-        driver.submit_job(
-            job_id=f"fair_{i}",
-            job_type="cpu",
-            duration=20,
-            cpu_reservation=CPU_REQ
-        )
+    with PROFILER.span("submit", cat="phase"):
+        for i in range(NUM_JOBS):
+            driver.submit_job(
+                job_id=f"fair_{i}",
+                job_type="cpu",
+                duration=20,
+                cpu_reservation=CPU_REQ
+            )
 
     print("[TEST] Waiting 5s for scheduler to settle...")
-    time.sleep(5)
+    PROFILER.sleep(5)
 
     # 2. Analisi Distribuzione
-    distribution = driver.get_node_distribution()
+    with PROFILER.span("poll", cat="phase"):
+        distribution = driver.get_node_distribution()
     print(f"\n[ANALYSIS] Node Distribution: {distribution}")
 
     counts = list(distribution.values())
@@ -74,7 +78,8 @@ def run_test():
         "orchestrator": "nomad",
         "distribution": distribution,
         "stdev": stdev,
-        "balanced": stdev < 1.5
+        "balanced": stdev < 1.5,
+        "harness_overhead": PROFILER.overhead_summary()
     }
 
     os.makedirs("results/nomad", exist_ok=True)
@@ -82,7 +87,9 @@ def run_test():
         json.dump(results, f, indent=2)
         print(f"[RESULT] Report saved to results/nomad/fairness.json")
 
-    driver.clean_jobs()
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace("results/nomad/fairness_trace.json")
 
 
 if __name__ == "__main__":
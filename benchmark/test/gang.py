@@ -0,0 +1,219 @@
+import sys
+import os
+import time
+import glob
+import json
+import numpy as np
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from utils.profiler import PROFILER
+
+GANG_SIZE = 4
+CPU_REQ = "1.0"
+# Fase 1: cluster libero, misura dello skew di avvio
+NUM_GANGS = 3
+GANG_DURATION = 10
+# Fase 2: cluster quasi pieno (3 nodi x 4 CPU = 12 CPU, 10 occupate da filler)
+NUM_FILLER_JOBS = 10
+FILLER_DURATION = 90
+NUM_CONTENDING_GANGS = 2
+OBSERVE_WINDOW = 45
+GANG_TIMEOUT = 300
+# I membri aspettano gli altri alla barriera del worker al massimo per questo tempo
+GANG_BARRIER_TIMEOUT = GANG_TIMEOUT
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/gang_scheduling.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/gang_scheduling_trace.json")
+
+
+def started_members(gang_id):
+    """Membri avviati del gang, dai marker {gang_id}-m{idx}.started scritti dal worker"""
+    members = {}
+    for fpath in glob.glob(f"{RESULTS_DIR}/{gang_id}-m*.started"):
+        try:
+            with open(fpath, 'r') as f:
+                data = json.load(f)
+            members[str(data["member"])] = data["start_ts"]
+        except (OSError, ValueError, KeyError):
+            pass
+    return members
+
+
+def at_barrier(gang_id):
+    """Membri avviati ancora fermi alla barriera: marker .started senza file risultato"""
+    finished = {os.path.basename(p)[:-len(".json")] for p in glob.glob(f"{RESULTS_DIR}/{gang_id}-m*.json")}
+    return {os.path.basename(p)[:-len(".started")] for p in glob.glob(f"{RESULTS_DIR}/{gang_id}-m*.started")} - finished
+
+
+def barrier_waits(gang_id):
+    waits = []
+    for fpath in glob.glob(f"{RESULTS_DIR}/{gang_id}-m*.json"):
+        try:
+            with open(fpath, 'r') as f:
+                wait = json.load(f).get("barrier_wait_s")
+        except (OSError, ValueError):
+            continue
+        if wait is not None:
+            waits.append(wait)
+    return waits
+
+
+def measure_start_skew(driver):
+    gang_ids = [f"gang-{i}" for i in range(NUM_GANGS)]
+    submission_times = {}
+
+    with PROFILER.span("submit", cat="phase", stage="skew"):
+        for gang_id in gang_ids:
+            submission_times[gang_id] = time.time()
+            driver.submit_job(job_id=gang_id, job_type="sleep", duration=GANG_DURATION,
+                              cpu_reservation=CPU_REQ, gang_size=GANG_SIZE,
+                              extra_env={"GANG_BARRIER_TIMEOUT": GANG_BARRIER_TIMEOUT})
+
+    expected = NUM_GANGS * GANG_SIZE
+    deadline = time.time() + GANG_TIMEOUT
+    with PROFILER.span("poll", cat="phase", stage="skew"):
+        while time.time() < deadline:
+            files = glob.glob(f"{RESULTS_DIR}/gang-*-m*.json")
+            print(f"\rStatus: {len(files)}/{expected} gang members finished...", end="")
+            if len(files) >= expected:
+                break
+            PROFILER.sleep(1)
+    print()
+
+    gangs = []
+    with PROFILER.span("analyze", cat="phase", stage="skew"):
+        for gang_id in gang_ids:
+            starts = sorted(started_members(gang_id).values())
+            entry = {"gang_id": gang_id, "members_started": len(starts)}
+            if starts:
+                entry["first_start_latency"] = round(starts[0] - submission_times[gang_id], 4)
+                entry["last_start_latency"] = round(starts[-1] - submission_times[gang_id], 4)
+                entry["start_skew"] = round(starts[-1] - starts[0], 4)
+            waits = barrier_waits(gang_id)
+            if waits:
+                # Il primo membro aspetta l'ultimo: ~ start skew visto dal worker
+                entry["barrier_wait_max"] = round(max(waits), 4)
+            gangs.append(entry)
+    return gangs
+
+
+def measure_partial_placement(driver):
+    """Con il cluster quasi pieno, osserva se i gang restano parzialmente piazzati (membri
+    avviati che tengono risorse mentre gli altri aspettano in coda)."""
+    with PROFILER.span("submit", cat="phase", stage="filler"):
+        for i in range(NUM_FILLER_JOBS):
+            driver.submit_job(job_id=f"gfill-{i}", job_type="sleep", duration=FILLER_DURATION,
+                              cpu_reservation=CPU_REQ)
+    PROFILER.sleep(10)
+
+    gang_ids = [f"gcont-{i}" for i in range(NUM_CONTENDING_GANGS)]
+    with PROFILER.span("submit", cat="phase", stage="contention"):
+        for gang_id in gang_ids:
+            driver.submit_job(job_id=gang_id, job_type="sleep", duration=GANG_DURATION,
+                              cpu_reservation=CPU_REQ, gang_size=GANG_SIZE,
+                              extra_env={"GANG_BARRIER_TIMEOUT": GANG_BARRIER_TIMEOUT})
+
+    # Campiona i membri avviati per tutta la finestra di osservazione
+    ever_partial = set()
+    samples = []
+    start = time.time()
+    with PROFILER.span("poll", cat="phase", stage="contention"):
+        while time.time() - start < OBSERVE_WINDOW:
+            snapshot = {gang_id: len(started_members(gang_id)) for gang_id in gang_ids}
+            waiting = {gang_id: len(at_barrier(gang_id)) for gang_id in gang_ids}
+            samples.append({"t": round(time.time() - start, 2), "started": snapshot, "at_barrier": waiting})
+            for gang_id, n in snapshot.items():
+                if 0 < n < GANG_SIZE:
+                    ever_partial.add(gang_id)
+            PROFILER.sleep(1)
+
+    final = samples[-1]["started"] if samples else {}
+    final_waiting = samples[-1]["at_barrier"] if samples else {}
+    # Deadlock: a fine finestra il gang è parziale, tutti i membri avviati sono ancora fermi alla
+    # barriera (tengono le risorse senza lavorare) e nessuno nuovo è partito nell'ultima metà
+    half = [s["started"] for s in samples if s["t"] >= OBSERVE_WINDOW / 2]
+    deadlocked = [g for g in gang_ids
+                  if 0 < final.get(g, 0) < GANG_SIZE and final_waiting.get(g) == final[g]
+                  and half and all(h[g] == final[g] for h in half)]
+
+    return {
+        "gangs": NUM_CONTENDING_GANGS,
+        "partially_placed": sorted(ever_partial),
+        "deadlocked": deadlocked,
+        "partial_placement_rate": round(len(ever_partial) / NUM_CONTENDING_GANGS, 4),
+        "deadlock_rate": round(len(deadlocked) / NUM_CONTENDING_GANGS, 4),
+        "final_started": final,
+        "final_at_barrier": final_waiting,
+        "timeline": samples
+    }
+
+
+def run_test():
+    print(f"--- TEST: GANG / CO-SCHEDULED JOBS ({GANG_SIZE} tasks per gang) ---")
+
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        os.system(f"rm -f {RESULTS_DIR}/*.json {RESULTS_DIR}/*.started {RESULTS_DIR}/*.killed")
+
+    print("[TEST] Phase 1: start skew on an idle cluster...")
+    skew_gangs = measure_start_skew(driver)
+    skews = [g["start_skew"] for g in skew_gangs if "start_skew" in g]
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+
+    print(f"[TEST] Phase 2: {NUM_CONTENDING_GANGS} gangs on a nearly full cluster "
+          f"({NUM_FILLER_JOBS} filler jobs)...")
+    contention = measure_partial_placement(driver)
+
+    print("\n--- RESULTS ---")
+    if skews:
+        print(f"Start skew (first -> last member): avg {np.mean(skews):.2f}s, max {np.max(skews):.2f}s")
+    print(f"Partially placed gangs: {len(contention['partially_placed'])}/{NUM_CONTENDING_GANGS}")
+    print(f"Deadlocked gangs:       {len(contention['deadlocked'])}/{NUM_CONTENDING_GANGS}")
+
+    output_data = {
+        "test_name": "gang_scheduling",
+        "orchestrator": "nomad",
+        "parameters": {
+            "gang_size": GANG_SIZE,
+            "cpu_reservation": CPU_REQ,
+            "num_gangs": NUM_GANGS,
+            "num_filler_jobs": NUM_FILLER_JOBS,
+            "num_contending_gangs": NUM_CONTENDING_GANGS,
+            "observe_window": OBSERVE_WINDOW,
+            "gang_barrier_timeout": GANG_BARRIER_TIMEOUT
+        },
+        "results": {
+            "start_skew_avg_seconds": round(float(np.mean(skews)), 4) if skews else None,
+            "start_skew_max_seconds": round(float(np.max(skews)), 4) if skews else None,
+            "gangs": skew_gangs,
+            "contention": contention
+        },
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
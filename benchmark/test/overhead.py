@@ -0,0 +1,164 @@
+import sys
+import os
+import time
+import json
+import numpy as np
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from drivers.docker_driver import DockerDriver
+from utils.profiler import PROFILER
+
+NUM_JOBS = 20
+# Nodo su cui gira la baseline `docker run` (None = nodo locale dell'harness).
+# Con un nodo remoto, start_ts ed end_ts vengono dal suo orologio: tenere NTP allineato.
+BASELINE_HOST = None
+JOB_TIMEOUT = 120
+POLL_INTERVAL = 0.05
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/overhead_floor.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/overhead_floor_trace.json")
+
+
+def wait_for_result(job_id):
+    fpath = os.path.join(RESULTS_DIR, f"{job_id}.json")
+    deadline = time.time() + JOB_TIMEOUT
+    while time.time() < deadline:
+        if os.path.exists(fpath):
+            try:
+                with open(fpath, 'r') as f:
+                    return json.load(f)
+            except ValueError:
+                pass  # File ancora in scrittura
+        PROFILER.sleep(POLL_INTERVAL, name="wait_result")
+    return None
+
+
+def measure(driver, prefix):
+    """Lancia NUM_JOBS job no-op uno alla volta (nessuna coda) e ritorna le latenze per job"""
+    start_latencies = []
+    completion_latencies = []
+    failures = 0
+
+    for i in range(NUM_JOBS):
+        job_id = f"{prefix}-{i}"
+        submit_ts = time.time()
+        with PROFILER.span("submit", cat="phase"):
+            ok = driver.submit_job(job_id=job_id, job_type="noop", duration=0)
+        if not ok:
+            failures += 1
+            continue
+
+        with PROFILER.span("poll", cat="phase"):
+            data = wait_for_result(job_id)
+        if data is None:
+            print(f"[WARNING] {job_id} did not finish within {JOB_TIMEOUT}s")
+            failures += 1
+            continue
+
+        # submit -> container avviato, submit -> risultato scritto
+        start_latencies.append(max(data["start_ts"] - submit_ts, 0.0))
+        completion_latencies.append(max(data["end_ts"] - submit_ts, 0.0))
+        print(f"\r[{prefix}] {i + 1}/{NUM_JOBS} done...", end="")
+
+    print()
+    return np.array(start_latencies), np.array(completion_latencies), failures
+
+
+def describe(values):
+    if len(values) == 0:
+        return None
+    return {
+        "mean": round(float(np.mean(values)), 4),
+        "stdev": round(float(np.std(values)), 4),
+        "min": round(float(np.min(values)), 4),
+        "p50": round(float(np.percentile(values, 50)), 4),
+        "p90": round(float(np.percentile(values, 90)), 4),
+        "p99": round(float(np.percentile(values, 99)), 4),
+        "max": round(float(np.max(values)), 4)
+    }
+
+
+def run_test():
+    print(f"--- TEST: ZERO-WORK OVERHEAD FLOOR ({NUM_JOBS} no-op jobs) ---")
+
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+    baseline = DockerDriver(host=BASELINE_HOST)
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        baseline.clean_jobs()
+        os.system(f"rm -f {RESULTS_DIR}/*.json")
+
+    print("[TEST] Baseline: direct container runtime (docker run)...")
+    base_start, base_completion, base_failures = measure(baseline, "noop-base")
+    with PROFILER.span("clean", cat="phase"):
+        baseline.clean_jobs()
+
+    print("[TEST] Orchestrator: no-op jobs through the driver...")
+    orch_start, orch_completion, orch_failures = measure(driver, "noop-orch")
+
+    if len(base_start) == 0 or len(orch_start) == 0:
+        print("[ERROR] Not enough successful jobs to compute the overhead.")
+        driver.clean_jobs()
+        return
+
+    with PROFILER.span("analyze", cat="phase"):
+        # Overhead per job = latenza via orchestratore - latenza mediana del container nudo
+        overhead_start = orch_start - np.median(base_start)
+        overhead_completion = orch_completion - np.median(base_completion)
+
+    print("\n--- RESULTS ---")
+    print(f"Baseline start latency (p50):     {np.median(base_start):.3f}s")
+    print(f"Orchestrator start latency (p50): {np.median(orch_start):.3f}s")
+    print(f"Orchestration overhead (p50):     {np.median(overhead_start):.3f}s")
+
+    output_data = {
+        "test_name": "overhead_floor",
+        "orchestrator": "nomad",
+        "parameters": {
+            "num_jobs": NUM_JOBS,
+            "job_type": "noop",
+            "baseline_host": BASELINE_HOST or "local"
+        },
+        "results": {
+            "baseline": {
+                "start_latency_seconds": describe(base_start),
+                "completion_latency_seconds": describe(base_completion),
+                "failures": base_failures
+            },
+            "orchestrator": {
+                "start_latency_seconds": describe(orch_start),
+                "completion_latency_seconds": describe(orch_completion),
+                "failures": orch_failures
+            },
+            "overhead": {
+                "start_seconds": describe(overhead_start),
+                "completion_seconds": describe(overhead_completion),
+                "start_series": [round(x, 4) for x in overhead_start.tolist()]
+            }
+        },
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,172 @@
+import sys
+import os
+import time
+import glob
+import json
+import collections
+import numpy as np
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from utils.profiler import PROFILER
+
+# Livelli di parallelismo: cpu_reservation = numero di processi del worker
+CORE_LEVELS = [1, 2, 4]
+WORK_UNITS = 400
+# Unità del job di calibrazione: gira da solo sul cluster libero prima di ogni burst
+CALIBRATION_UNITS = 20
+# Fase "isolated": un job per volta sul cluster libero
+# Fase "packed": abbastanza job da riempire il cluster (capacità scoperta con driver.get_nodes())
+# Sotto questa efficienza il parallelismo riservato non è stato davvero fornito
+EFFICIENCY_THRESHOLD = 0.8
+JOB_TIMEOUT = 900
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/parallel_scaling.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/parallel_scaling_trace.json")
+
+
+def submit_and_wait(driver, job_ids, cores, work_units=WORK_UNITS, unit_time=None):
+    env = {"PROCS": cores, "WORK_UNITS": work_units}
+    if unit_time:
+        env["UNIT_TIME_1CORE"] = unit_time
+    with PROFILER.span("submit", cat="phase", cores=cores, jobs=len(job_ids)):
+        for job_id in job_ids:
+            driver.submit_job(job_id=job_id, job_type="parallel", cpu_reservation=str(cores),
+                              extra_env=env)
+
+    deadline = time.time() + JOB_TIMEOUT
+    with PROFILER.span("poll", cat="phase", cores=cores):
+        while time.time() < deadline:
+            done = [j for j in job_ids if os.path.exists(f"{RESULTS_DIR}/{j}.json")]
+            print(f"\rStatus: {len(done)}/{len(job_ids)} finished...", end="")
+            if len(done) >= len(job_ids):
+                break
+            PROFILER.sleep(2)
+    print()
+
+    results = []
+    with PROFILER.span("collect", cat="phase", cores=cores):
+        for job_id in job_ids:
+            fpath = f"{RESULTS_DIR}/{job_id}.json"
+            if not os.path.exists(fpath):
+                continue
+            with open(fpath, 'r') as f:
+                data = json.load(f)
+            if data.get("parallel"):
+                results.append(data)
+    return results
+
+
+def summarize(results):
+    if not results:
+        return {"jobs": 0}
+    eff = np.array([r["parallel"]["parallel_efficiency"] for r in results])
+    eff_cores = np.array([r["parallel"]["effective_cores"] for r in results])
+    per_core = np.array([r["parallel"]["per_core_units_per_sec"] for r in results])
+    # Job co-locati sullo stesso nodo: se le reservation sono rispettate non si rubano core
+    per_node = collections.Counter(r["node"] for r in results)
+    return {
+        "jobs": len(results),
+        "parallel_efficiency_avg": round(float(eff.mean()), 4),
+        "parallel_efficiency_min": round(float(eff.min()), 4),
+        "effective_cores_avg": round(float(eff_cores.mean()), 4),
+        "per_core_units_per_sec_avg": round(float(per_core.mean()), 4),
+        "wall_seconds_avg": round(float(np.mean([r["parallel"]["wall_s"] for r in results])), 4),
+        "max_jobs_per_node": max(per_node.values()),
+        "parallelism_delivered": bool(eff.min() >= EFFICIENCY_THRESHOLD)
+    }
+
+
+def run_test():
+    print(f"--- TEST: PARALLEL SCALING (cores {CORE_LEVELS}, {WORK_UNITS} work units) ---")
+
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        os.system(f"rm -f {RESULTS_DIR}/*.json")
+
+    cluster_cpus = int(sum(n["cpus"] for n in driver.get_nodes()))
+    print(f"[TEST] Discovered cluster capacity: {cluster_cpus} CPUs")
+
+    # Riferimento a un core misurato una volta sola, senza altri job sul cluster: i job del
+    # burst lo ricevono in UNIT_TIME_1CORE invece di calibrarsi sotto contesa
+    print("[TEST] Calibrating single-core unit time on the idle cluster...")
+    calibration = submit_and_wait(driver, ["par-calibration"], 1, work_units=CALIBRATION_UNITS)
+    unit_time = calibration[0]["parallel"]["unit_time_1core"] if calibration else None
+    if unit_time is None:
+        print("[WARN] Calibration job failed: jobs will calibrate in place (possibly contended).")
+    else:
+        print(f"[TEST] Single-core unit time: {unit_time * 1000:.1f} ms")
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+
+    levels = []
+    for cores in CORE_LEVELS:
+        print(f"[TEST] {cores} core(s): isolated job...")
+        isolated = submit_and_wait(driver, [f"par{cores}-solo"], cores, unit_time=unit_time)
+
+        packed_jobs = max(cluster_cpus // cores, 1)
+        print(f"[TEST] {cores} core(s): {packed_jobs} packed jobs...")
+        packed = submit_and_wait(driver, [f"par{cores}-pack-{i}" for i in range(packed_jobs)], cores,
+                                 unit_time=unit_time)
+
+        with PROFILER.span("analyze", cat="phase", cores=cores):
+            level = {
+                "cores": cores,
+                "isolated": summarize(isolated),
+                "packed": summarize(packed)
+            }
+            iso_eff = level["isolated"].get("parallel_efficiency_avg")
+            pack_eff = level["packed"].get("parallel_efficiency_avg")
+            # Perdita di efficienza dovuta alla co-locazione (core condivisi)
+            level["colocation_slowdown"] = round(iso_eff / pack_eff, 4) if iso_eff and pack_eff else None
+        levels.append(level)
+
+        with PROFILER.span("clean", cat="phase"):
+            driver.clean_jobs()
+
+    print("\n--- RESULTS ---")
+    for level in levels:
+        iso, pack = level["isolated"], level["packed"]
+        if not iso.get("jobs") or not pack.get("jobs"):
+            print(f"{level['cores']} core(s): missing results")
+            continue
+        print(f"{level['cores']} core(s): efficiency isolated {iso['parallel_efficiency_avg']:.2f} "
+              f"({iso['effective_cores_avg']:.2f} cores), packed {pack['parallel_efficiency_avg']:.2f} "
+              f"({pack['effective_cores_avg']:.2f} cores) -> delivered: {pack['parallelism_delivered']}")
+
+    output_data = {
+        "test_name": "parallel_scaling",
+        "orchestrator": "nomad",
+        "parameters": {
+            "core_levels": CORE_LEVELS,
+            "work_units": WORK_UNITS,
+            "cluster_cpus": cluster_cpus,
+            "unit_time_1core": unit_time,
+            "efficiency_threshold": EFFICIENCY_THRESHOLD
+        },
+        "results": {
+            "levels": levels
+        },
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from utils.dag import DagRunner, chain, fan_out_in, layered
+from utils.profiler import PROFILER
+
+JOB_DURATION = 2
+CHAIN_DEPTH = 8
+FAN_WIDTH = 6
+LAYERS = (4, 3)  # depth x width
+POLL_INTERVAL = 0.2
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/pipeline.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/pipeline_trace.json")
+
+
+def run_test():
+    print("--- TEST: DEPENDENT JOB PIPELINES (DAG) ---")
+
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+
+    dags = [
+        chain("dag-chain", CHAIN_DEPTH, duration=JOB_DURATION),
+        fan_out_in("dag-fan", FAN_WIDTH, duration=JOB_DURATION),
+        layered("dag-layer", LAYERS[0], LAYERS[1], duration=JOB_DURATION)
+    ]
+
+    results = []
+    for dag in dags:
+        with PROFILER.span("clean", cat="phase"):
+            driver.clean_jobs()
+            os.system(f"rm -f {RESULTS_DIR}/*.json")
+
+        print(f"[TEST] Running {dag.name} ({len(dag.jobs)} jobs, {len(dag.edges())} edges)...")
+        summary = DagRunner(driver, dag, RESULTS_DIR, poll_interval=POLL_INTERVAL).run()
+        results.append(summary)
+
+        if "makespan_gap" in summary:
+            print(f"   Ideal makespan:  {summary['ideal_makespan']:.2f}s")
+            print(f"   Actual makespan: {summary['actual_makespan']:.2f}s (gap {summary['makespan_gap']:.2f}s)")
+            print(f"   Avg dispatch latency per edge: {summary['dispatch_latency_avg']:.2f}s")
+        else:
+            print(f"   [WARNING] DAG incomplete, failed jobs: {summary['failed']}")
+
+    output_data = {
+        "test_name": "dag_pipeline",
+        "orchestrator": "nomad",
+        "parameters": {
+            "job_duration": JOB_DURATION,
+            "chain_depth": CHAIN_DEPTH,
+            "fan_width": FAN_WIDTH,
+            "layers": list(LAYERS),
+            "poll_interval": POLL_INTERVAL
+        },
+        "results": results,
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,173 @@
+import sys
+import os
+import time
+import glob
+import json
+import numpy as np
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from utils.profiler import PROFILER
+
+# Cluster: 3 nodi x 4 CPU = 12 CPU. 18 job low da 1 CPU lo saturano con coda.
+NUM_LOW_JOBS = 18
+NUM_HIGH_JOBS = 4
+LOW_PRIORITY = 10
+HIGH_PRIORITY = 90
+LOW_DURATION = 60
+HIGH_DURATION = 10
+CPU_REQ = "1.0"
+SETTLE_TIME = 10
+HIGH_TIMEOUT = 300
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/priority_preemption.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/priority_preemption_trace.json")
+
+
+def load_killed_records(prefix):
+    """Record scritti dal worker quando riceve SIGTERM ({job_id}.{ms}.killed)"""
+    records = []
+    for fpath in glob.glob(f"{RESULTS_DIR}/{prefix}-*.killed"):
+        try:
+            with open(fpath, 'r') as f:
+                records.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return records
+
+
+def run_test():
+    print(f"--- TEST: PRIORITY & PREEMPTION ({NUM_LOW_JOBS} low + {NUM_HIGH_JOBS} high, {CPU_REQ} CPU req) ---")
+
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        os.system(f"rm -f {RESULTS_DIR}/*.json {RESULTS_DIR}/*.killed")
+
+    preemption_enabled = driver.enable_preemption()
+    print(f"[TEST] Priority support: {driver.PRIORITY_SUPPORT} (preemption enabled: {preemption_enabled})")
+
+    # 1. Saturazione con lavoro a bassa priorità
+    print("[TEST] Saturating cluster with low-priority jobs...")
+    failed_low = 0
+    with PROFILER.span("submit", cat="phase", priority="low"):
+        for i in range(NUM_LOW_JOBS):
+            if not driver.submit_job(job_id=f"prio-low-{i}", job_type="sleep", duration=LOW_DURATION,
+                                     cpu_reservation=CPU_REQ, priority=LOW_PRIORITY):
+                failed_low += 1
+    if failed_low:
+        print(f"[WARNING] {failed_low}/{NUM_LOW_JOBS} low-priority submissions failed ({driver.last_error})")
+
+    print(f"[TEST] Waiting {SETTLE_TIME}s for the cluster to fill up...")
+    PROFILER.sleep(SETTLE_TIME)
+    running_before = sum(driver.get_node_distribution().values())
+    print(f"[TEST] Running jobs before injection: {running_before}")
+
+    # 2. Iniezione job ad alta priorità
+    print("[TEST] Injecting high-priority jobs...")
+    submission_times = {}
+    failed_high = []
+    with PROFILER.span("submit", cat="phase", priority="high"):
+        for i in range(NUM_HIGH_JOBS):
+            job_id = f"prio-high-{i}"
+            submit_ts = time.time()
+            if driver.submit_job(job_id=job_id, job_type="sleep", duration=HIGH_DURATION,
+                                 cpu_reservation=CPU_REQ, priority=HIGH_PRIORITY):
+                submission_times[job_id] = submit_ts
+            else:
+                failed_high.append(job_id)
+                print(f"[WARNING] High-priority job {job_id} rejected ({driver.last_error})")
+
+    # Solo i job accettati possono partire: i rifiutati non entrano nel campione di latenza
+    expected_high = len(submission_times)
+    deadline = time.time() + HIGH_TIMEOUT
+    with PROFILER.span("poll", cat="phase"):
+        while expected_high and time.time() < deadline:
+            files = glob.glob(f"{RESULTS_DIR}/prio-high-*.json")
+            print(f"\rStatus: {len(files)}/{expected_high} high-priority finished...", end="")
+            if len(files) >= expected_high:
+                break
+            PROFILER.sleep(1)
+    print()
+
+    # 3. Analisi
+    with PROFILER.span("collect", cat="phase"):
+        time_to_start = {}
+        for job_id, submit_ts in submission_times.items():
+            fpath = os.path.join(RESULTS_DIR, f"{job_id}.json")
+            if os.path.exists(fpath):
+                with open(fpath, 'r') as f:
+                    data = json.load(f)
+                time_to_start[job_id] = max(data["start_ts"] - submit_ts, 0.0)
+        killed = load_killed_records("prio-low")
+
+    with PROFILER.span("analyze", cat="phase"):
+        starts = list(time_to_start.values())
+        preempted_jobs = sorted({r["job_id"] for r in killed})
+        # work_lost è tempo di parete: per i CPU-secondi persi va pesato con la reservation
+        wasted_wall = sum(r["work_lost"] for r in killed)
+        wasted_cpu = wasted_wall * float(CPU_REQ)
+
+    print("\n--- RESULTS ---")
+    if starts:
+        print(f"High-priority time-to-start: avg {np.mean(starts):.2f}s, max {np.max(starts):.2f}s")
+    print(f"High-priority jobs finished: {len(starts)}/{expected_high} accepted "
+          f"({len(failed_high)} submissions failed)")
+    print(f"Preempted low-priority attempts: {len(killed)} ({len(preempted_jobs)} jobs)")
+    print(f"Wasted work: {wasted_wall:.2f} wall-seconds, {wasted_cpu:.2f} CPU-seconds (reserved)")
+
+    output_data = {
+        "test_name": "priority_preemption",
+        "orchestrator": "nomad",
+        "parameters": {
+            "num_low_jobs": NUM_LOW_JOBS,
+            "num_high_jobs": NUM_HIGH_JOBS,
+            "low_priority": LOW_PRIORITY,
+            "high_priority": HIGH_PRIORITY,
+            "low_duration": LOW_DURATION,
+            "high_duration": HIGH_DURATION,
+            "cpu_reservation": CPU_REQ
+        },
+        "priority_support": driver.PRIORITY_SUPPORT,
+        "preemption_enabled": preemption_enabled,
+        "results": {
+            "running_before_injection": running_before,
+            "low_submit_failures": failed_low,
+            "high_submit_failures": len(failed_high),
+            "high_rejected_jobs": failed_high,
+            "high_finished": len(starts),
+            "high_time_to_start_avg_seconds": round(float(np.mean(starts)), 4) if starts else None,
+            "high_time_to_start_max_seconds": round(float(np.max(starts)), 4) if starts else None,
+            "high_time_to_start_series": {k: round(v, 2) for k, v in time_to_start.items()},
+            "preempted_attempts": len(killed),
+            "preempted_jobs": preempted_jobs,
+            "wasted_work_wall_seconds": round(wasted_wall, 4),
+            "wasted_work_cpu_seconds": round(wasted_cpu, 4)
+        },
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        # Configurazione dello scheduler (Nomad) e PriorityClass (K8s) come prima del test
+        driver.restore_preemption()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
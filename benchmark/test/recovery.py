@@ -10,8 +10,10 @@ sys.path.append(parent_dir)
 
 #from drivers.k8s_driver import K8sDriver
 from drivers.nomad_driver import NomadDriver
+from utils.profiler import PROFILER
 
 JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/recovery.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/recovery_trace.json")
 
 
 def run_test():
@@ -20,7 +22,8 @@ def run_test():
     driver = NomadDriver()
 
 
-    driver.clean_jobs()
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
 
     job_id = "recovery-test"
 
@@ -28,12 +31,13 @@ def run_test():
     # Usa 'Never' per costringere K8s a creare un NUOVO Pod quando il primo muore
     print(f"[TEST] Launching 'Suicide Job' (sleep 5; exit 1)...")
 
-    success = driver.submit_job(
-        job_id=job_id,
-        cpu_reservation="0.1",
-        restart_policy="allow-retry",
-        command='sh -c "sleep 5; echo CRASHING NOW; exit 1"'
-    )
+    with PROFILER.span("submit", cat="phase"):
+        success = driver.submit_job(
+            job_id=job_id,
+            cpu_reservation="0.1",
+            restart_policy="allow-retry",
+            command='sh -c "sleep 5; echo CRASHING NOW; exit 1"'
+        )
 
     if not success:
         print("[ERROR] Failed to submit job.")
@@ -47,31 +51,32 @@ def run_test():
     failure_detected = False
 
     # Loop di monitoraggio esteso a 30s per dare tempo a K8s di reagire
-    for i in range(60):
-        history = driver.get_task_history(job_id)
+    with PROFILER.span("poll", cat="phase"):
+        for i in range(60):
+            history = driver.get_task_history(job_id)
 
-        if i % 5 == 0:  # Stampa ogni 5 secondi per non intasare
-            print(f"   [DEBUG {i}s] History: {history}")
+            if i % 5 == 0:  # Stampa ogni 5 secondi per non intasare
+                print(f"   [DEBUG {i}s] History: {history}")
 
-        # Cerca sia "Failed" (Swarm) che "failed" (Nomad)
-        error_count = sum(1 for line in history if "Error" in line or "Failed" in line or "failed" in line)
-        # Cerca sia "Running" che "running"
-        running_count = sum(1 for line in history if "Running" in line or "running" in line)
-        # Cerca "Completed" o "complete" (Nomad usa 'complete')
-        completed_count = sum(1 for line in history if "Completed" in line or "complete" in line)
+            # Cerca sia "Failed" (Swarm) che "failed" (Nomad)
+            error_count = sum(1 for line in history if "Error" in line or "Failed" in line or "failed" in line)
+            # Cerca sia "Running" che "running"
+            running_count = sum(1 for line in history if "Running" in line or "running" in line)
+            # Cerca "Completed" o "complete" (Nomad usa 'complete')
+            completed_count = sum(1 for line in history if "Completed" in line or "complete" in line)
 
-        # Detection logic
-        if error_count > 0 and not failure_detected:
-            print(f"   [{i}s] Detection: Pod has failed (Error/Crash). Waiting for restart...")
-            failure_detected = True
+            # Detection logic
+            if error_count > 0 and not failure_detected:
+                print(f"   [{i}s] Detection: Pod has failed (Error/Crash). Waiting for restart...")
+                failure_detected = True
 
-        # Recovery Logic: Abbiamo visto un errore PRIMA, e ORA c'è un pod Running
-        if failure_detected and (running_count > 0 or completed_count > 0):
-            print(f"   [{i}s] SUCCESS: New Pod spawned and is Active!")
-            recovered = True
-            break
+            # Recovery Logic: Abbiamo visto un errore PRIMA, e ORA c'è un pod Running
+            if failure_detected and (running_count > 0 or completed_count > 0):
+                print(f"   [{i}s] SUCCESS: New Pod spawned and is Active!")
+                recovered = True
+                break
 
-        time.sleep(1)
+            PROFILER.sleep(1)
 
     print("-" * 30)
     if recovered:
@@ -90,7 +95,8 @@ def run_test():
             "failure_detected": failure_detected,
             "recovered": recovered,
             "mechanism": "Pod Replacement (restartPolicy: Never)"
-        }
+        },
+        "harness_overhead": PROFILER.overhead_summary()
     }
 
     os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
@@ -98,7 +104,9 @@ def run_test():
         json.dump(output_data, f, indent=2)
     print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
 
-    driver.clean_jobs()
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+import sys
+import os
+import json
+import numpy as np
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from utils.profiler import PROFILER
+from utils.results import clean_runs
+from utils.trace import TraceReplayer
+from utils.warehouse import new_run_id
+
+# Trace CSV/JSONL: arrival_offset, duration, job_type, cpu_reservation, constraints
+TRACE_FILE = os.path.join(parent_dir, "traces/sample.csv")
+SPEEDUP = 4.0
+# True: anche le durate sono divise per SPEEDUP (copia compressa del trace, stesso carico);
+# False: solo gli arrivi sono accelerati, il carico offerto cresce di SPEEDUP volte
+SCALE_DURATIONS = True
+LIMIT = None  # Numero massimo di righe da riprodurre (None = tutto il trace)
+BACKLOG_INTERVAL = 2.0
+COMPLETION_TIMEOUT = 1800
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/trace_replay.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/trace_replay_trace.json")
+
+
+def percentiles(values):
+    if len(values) == 0:
+        return None
+    arr = np.frombuffer(values, dtype=np.float64)
+    return {
+        "mean": round(float(arr.mean()), 4),
+        "p50": round(float(np.percentile(arr, 50)), 4),
+        "p90": round(float(np.percentile(arr, 90)), 4),
+        "p99": round(float(np.percentile(arr, 99)), 4),
+        "max": round(float(arr.max()), 4)
+    }
+
+
+def run_test():
+    print(f"--- TEST: TRACE REPLAY ({os.path.basename(TRACE_FILE)}, x{SPEEDUP}) ---")
+
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        clean_runs(RESULTS_DIR)
+
+    # Risultati sharded in {RESULTS_DIR}/{run_id}/{shard}/: a milioni di job niente directory piatta
+    run_id = new_run_id("nomad", "trace_replay")
+    replayer = TraceReplayer(driver, TRACE_FILE, RESULTS_DIR, run_id, speedup=SPEEDUP, limit=LIMIT,
+                             backlog_interval=BACKLOG_INTERVAL, scale_durations=SCALE_DURATIONS)
+
+    print("[TEST] Replaying trace...")
+    submitted = replayer.run()
+    print(f"[TEST] {submitted} jobs accepted ({replayer.failed} rejected). Waiting for completion...")
+    completed = replayer.wait_for_completion(COMPLETION_TIMEOUT)
+
+    lags = replayer.submit_lags()
+    call_latencies = replayer.call_latency
+    start_latencies = replayer.start_latencies()
+
+    with PROFILER.span("analyze", cat="phase"):
+        lag_stats = percentiles(lags)
+        call_stats = percentiles(call_latencies)
+        saturation = replayer.harness_saturation()
+        start_stats = percentiles(start_latencies)
+        max_backlog = max((b["backlog"] for b in replayer.backlog), default=0)
+
+    print("\n--- RESULTS ---")
+    if lag_stats:
+        print(f"Harness lag (scheduled -> submit call): p50 {lag_stats['p50']:.4f}s, p99 {lag_stats['p99']:.4f}s")
+    if call_stats:
+        print(f"Submit call latency (orchestrator): p50 {call_stats['p50']:.4f}s, p99 {call_stats['p99']:.4f}s")
+    if saturation and saturation["saturated"]:
+        print(f"[WARNING] Harness saturated: submit calls ({saturation['mean_call_latency_s']:.4f}s) are slower "
+              f"than the inter-arrival gap ({saturation['mean_interarrival_s']:.4f}s); lag is harness backlog.")
+    if start_stats:
+        print(f"Start latency: p50 {start_stats['p50']:.2f}s, p99 {start_stats['p99']:.2f}s")
+    print(f"Max backlog: {max_backlog} jobs")
+
+    output_data = {
+        "test_name": "trace_replay",
+        "orchestrator": "nomad",
+        "run_id": run_id,
+        "parameters": {
+            "trace_file": os.path.basename(TRACE_FILE),
+            "speedup": SPEEDUP,
+            "scale_durations": SCALE_DURATIONS,
+            "limit": LIMIT
+        },
+        "results": {
+            "submitted": submitted,
+            "rejected": replayer.failed,
+            "completed": completed,
+            "out_of_order_rows": replayer.out_of_order,
+            # Lag = coda dell'harness (submit sincrono); latenza della chiamata = orchestratore
+            "submit_lag_seconds": lag_stats,
+            "submit_call_latency_seconds": call_stats,
+            "harness_saturation": saturation,
+            "start_latency_seconds": start_stats,
+            "max_backlog": max_backlog,
+            "backlog_timeline": replayer.backlog
+        },
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
@@ -1,7 +1,6 @@
 import sys
 import os
 import time
-import glob
 import json
 import numpy as np
 
@@ -13,12 +12,20 @@ sys.path.append(parent_dir)
 #from drivers.swarm_driver import SwarmDriver
 #from drivers.k8s_driver import K8sDriver
 from drivers.nomad_driver import NomadDriver
+from utils.metrics import METRICS
+from utils.profiler import PROFILER
+from utils.results import ResultAggregator, clean_runs, list_results, lookup
+from utils.submission import SubmissionManager, RetryPolicy
+from utils.warehouse import ResultsWarehouse, new_run_id
 
 NUM_JOBS = 30
 JOB_DURATION = 15
 CPU_REQ = "1.0"
 RESULTS_DIR = "/srv/nfs/cob_results"
+# Retry dei submit rifiutati per rate limiting / errori transitori
+RETRY_POLICY = RetryPolicy(max_retries=5, base_delay=0.2, max_delay=10.0)
 JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/saturation.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/saturation_trace.json")
 
 
 def run_test():
@@ -28,61 +35,75 @@ def run_test():
     #driver = K8sDriver()
     driver = NomadDriver()
 
-    driver.clean_jobs()
-    os.system(f"rm -f {RESULTS_DIR}/*.json")
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        os.system(f"rm -f {RESULTS_DIR}/*.json")
+        clean_runs(RESULTS_DIR)
 
-    submission_times = {}
-    print("[TEST] Burst Launching jobs...")
-
-    for i in range(NUM_JOBS):
-        job_id = f"sat-{i}"
-        submission_times[job_id] = time.time()
-
-        success = driver.submit_job(
-            job_id=job_id,
-            job_type="sleep",  # Usiamo sleep per non stressare davvero la CPU, ma occupare lo slot logico
-            duration=JOB_DURATION,
-            cpu_reservation=CPU_REQ
-        )
-        if not success:
-            print(f"[WARNING] Job {job_id} rejected by orchestrator immediately!")
+    METRICS.start("nomad", "saturation_queueing", driver=driver)
 
-    print(f"[TEST] All {NUM_JOBS} jobs submitted. Monitoring queue processing...")
+    # Risultati sharded in {RESULTS_DIR}/{run_id}/{shard}/ (vedi utils/results.py)
+    run_id = new_run_id("nomad", "saturation_queueing")
 
-    while True:
-        files = glob.glob(f"{RESULTS_DIR}/sat-*.json")
-        completed = len(files)
-        print(f"\rStatus: {completed}/{NUM_JOBS} finished...", end="")
+    submitter = SubmissionManager(driver, RETRY_POLICY)
+    submission_times = {}
+    print("[TEST] Burst Launching jobs...")
 
-        if completed >= NUM_JOBS:
-            break
-        time.sleep(1)
+    with PROFILER.span("submit", cat="phase"):
+        for i in range(NUM_JOBS):
+            job_id = f"sat-{i}"
+            submission_times[job_id] = time.time()
+
+            success = submitter.submit(
+                job_id=job_id,
+                job_type="sleep",  # Usiamo sleep per non stressare davvero la CPU, ma occupare lo slot logico
+                duration=JOB_DURATION,
+                cpu_reservation=CPU_REQ,
+                extra_env={"RUN_ID": run_id}
+            )
+            if not success:
+                print(f"[WARNING] Job {job_id} rejected by orchestrator ({submitter.rejected[job_id]})!")
+
+    # I job rifiutati definitivamente non scriveranno mai un risultato: non li aspettiamo
+    expected_jobs = len(submitter.accepted)
+    if expected_jobs == 0:
+        print(f"[ERROR] No job accepted: {submitter.stats()['rejected_by_category']}")
+        METRICS.stop()
+        driver.clean_jobs()
+        return
+    print(f"[TEST] {expected_jobs}/{NUM_JOBS} jobs accepted. Monitoring queue processing...")
+
+    with PROFILER.span("poll", cat="phase"):
+        while True:
+            with PROFILER.span("glob", cat="collect"):
+                files = list_results(RESULTS_DIR, run_id, prefix="sat-")
+            METRICS.observe_results(files)
+            completed = len(files)
+            print(f"\rStatus: {completed}/{expected_jobs} finished...", end="")
+
+            if completed >= expected_jobs:
+                break
+            PROFILER.sleep(1)
 
     print("\n[TEST] All jobs finished. Analyzing Queue Times...")
-    queue_times = []
-
-    for i in range(NUM_JOBS):
-        job_id = f"sat-{i}"
-        fpath = os.path.join(RESULTS_DIR, f"{job_id}.json")
-
-        if os.path.exists(fpath):
-            with open(fpath, 'r') as f:
-                data = json.load(f)
-
-            # Start TS (dal container) - Submission TS (dal driver)
-            start_ts = data["start_ts"]
-            submit_ts = submission_times.get(job_id, start_ts)
-
-            wait_time = start_ts - submit_ts
-            # Correggi eventuali negativi dovuti a clock drift millimetrico
-            if wait_time < 0: wait_time = 0
-
-            queue_times.append(wait_time)
+    with PROFILER.span("collect", cat="phase"):
+        aggregator = ResultAggregator(RESULTS_DIR, run_id)
+        rows = aggregator.aggregate(prefix="sat-")
+        archive_path = aggregator.save(rows)
 
     # Stats
-    avg_wait = np.mean(queue_times)
-    max_wait = np.max(queue_times)
-    min_wait = np.min(queue_times)
+    with PROFILER.span("analyze", cat="phase"):
+        # Allinea i risultati ai submit (ordine di sottomissione)
+        job_ids = list(submission_times)
+        idx = lookup(rows, job_ids)
+        found = idx >= 0
+        submit_ts = np.array([submission_times[j] for j in job_ids])[found]
+        # Start TS (dal container) - Submission TS (dal driver); negativi = clock drift millimetrico
+        queue_times = np.maximum(rows["start_ts"][idx[found]] - submit_ts, 0.0)
+
+        avg_wait = np.mean(queue_times)
+        max_wait = np.max(queue_times)
+        min_wait = np.min(queue_times)
 
     print(f"\n--- RESULTS ---")
     print(f"Average Queue Time: {avg_wait:.2f}s")
@@ -105,8 +126,13 @@ def run_test():
             "avg_queue_time_seconds": round(avg_wait, 4),
             "max_queue_time_seconds": round(max_wait, 4),
             "min_queue_time_seconds": round(min_wait, 4),
-            "queue_times_series": [round(x, 2) for x in queue_times]
-        }
+            "queue_times_series": [round(float(x), 2) for x in queue_times]
+        },
+        "results_archive": archive_path,
+        "submission": submitter.stats(),
+        # Come "CPU_REQ" è stato tradotto nelle risorse native dell'orchestratore
+        "resource_translation": driver.last_resources,
+        "harness_overhead": PROFILER.overhead_summary()
     }
 
     os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
@@ -115,7 +141,16 @@ def run_test():
 
     print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
 
-    driver.clean_jobs()
+    # Archivia i risultati per-job prima che il prossimo test svuoti RESULTS_DIR
+    warehouse = ResultsWarehouse()
+    warehouse.ingest_array(run_id, "nomad", "saturation_queueing", rows,
+                           submission_times=submission_times, summary=output_data)
+    warehouse.close()
+
+    METRICS.stop()
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
 
 
 if __name__ == "__main__":
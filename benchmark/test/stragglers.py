@@ -0,0 +1,124 @@
+import sys
+import os
+import time
+import json
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from utils.heartbeat import HeartbeatCollector
+from utils.profiler import PROFILER
+from utils.results import clean_runs, list_results
+from utils.warehouse import new_run_id
+
+# Burst di job CPU con reservation piccola: l'orchestratore può co-locarne più di uno per core
+CPU_REQ = "0.5"
+# Job offerti = JOBS_PER_CPU x CPU scoperte con driver.get_nodes()
+JOBS_PER_CPU = 2
+JOB_DURATION = 60
+HEARTBEAT_INTERVAL = 1.0
+# Straggler: tasso di progresso sotto questa frazione della mediana della coorte
+STRAGGLER_RATIO = 0.5
+# ...per almeno questi intervalli consecutivi (i cali brevi non contano)
+SUSTAIN_AFTER = 3
+COMPLETION_TIMEOUT = 900
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/stragglers.json")
+TIMELINES_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/stragglers_timelines.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/stragglers_trace.json")
+
+
+def run_test():
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+
+    cluster_cpus = int(sum(n["cpus"] for n in driver.get_nodes()))
+    num_jobs = max(cluster_cpus * JOBS_PER_CPU, 1)
+    print(f"--- TEST: PROGRESS HEARTBEATS & STRAGGLERS ({num_jobs} Jobs, {CPU_REQ} CPU req) ---")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        clean_runs(RESULTS_DIR)
+
+    # Risultati sharded in {RESULTS_DIR}/{run_id}/{shard}/ (vedi utils/results.py)
+    run_id = new_run_id("nomad", "progress_stragglers")
+
+    collector = HeartbeatCollector(interval=HEARTBEAT_INTERVAL, straggler_ratio=STRAGGLER_RATIO,
+                                   sustain_after=SUSTAIN_AFTER).start()
+    heartbeat_env = dict(collector.worker_env(), RUN_ID=run_id)
+    print(f"[TEST] Workers will send heartbeats to {heartbeat_env['HEARTBEAT_ADDR']}")
+
+    with PROFILER.span("submit", cat="phase"):
+        for i in range(num_jobs):
+            driver.submit_job(job_id=f"hb-{i}", job_type="cpu", duration=JOB_DURATION,
+                              cpu_reservation=CPU_REQ, extra_env=heartbeat_env)
+
+    deadline = time.time() + COMPLETION_TIMEOUT
+    with PROFILER.span("poll", cat="phase"):
+        while time.time() < deadline:
+            # Straggler segnalati in tempo reale, mentre il burst è in corso
+            collector.check()
+            files = list_results(RESULTS_DIR, run_id, prefix="hb-")
+            print(f"\rStatus: {len(files)}/{num_jobs} finished, {len(collector.jobs)} reporting, "
+                  f"{len(collector.active_stragglers())} straggling...", end="")
+            if len(files) >= num_jobs:
+                break
+            PROFILER.sleep(HEARTBEAT_INTERVAL)
+    print()
+    collector.stop()
+    # Chiude gli episodi dei job terminati dopo l'ultimo controllo
+    collector.check()
+
+    with PROFILER.span("analyze", cat="phase"):
+        summary = collector.summary()
+
+    print("\n--- RESULTS ---")
+    print(f"Heartbeats received: {summary['packets']} ({summary['lost']} lost)")
+    print(f"Stragglers:          {len(summary['stragglers'])}/{num_jobs}")
+    for key, rec in sorted(summary["stragglers"].items()):
+        print(f"  {key} on {rec['node']}: {len(rec['episodes'])} episode(s), {rec['straggling_s']:.1f}s slow")
+    silent_episodes = sum(len(rec["episodes"]) for rec in summary["silent"].values())
+    print(f"Silent jobs:         {len(summary['silent'])} ({silent_episodes} episodes, "
+          f"{len(collector.active_silent())} never resumed)")
+    for node, stats in sorted(summary["nodes"].items()):
+        print(f"  {node}: {stats['jobs']} jobs, rate {stats['rate_mean']:.2f} it/s "
+              f"(stdev {stats['rate_stdev']:.2f})")
+
+    output_data = {
+        "test_name": "progress_stragglers",
+        "orchestrator": "nomad",
+        "parameters": {
+            "num_jobs": num_jobs,
+            "cpu_reservation": CPU_REQ,
+            "job_duration": JOB_DURATION,
+            "heartbeat_interval": HEARTBEAT_INTERVAL,
+            "straggler_ratio": STRAGGLER_RATIO,
+            "sustain_after": SUSTAIN_AFTER
+        },
+        "results": summary,
+        "timelines_file": os.path.basename(TIMELINES_OUTPUT_FILE),
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+    # Timeline [t, iterazioni/s, CPU-s/s] per job, separate perché crescono con la durata
+    with open(TIMELINES_OUTPUT_FILE, "w") as f:
+        json.dump(collector.timelines(), f)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
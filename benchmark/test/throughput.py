@@ -1,7 +1,6 @@
 import sys
 import os
 import time
-import glob
 import json
 
 # Setup path
@@ -12,11 +11,16 @@ sys.path.append(parent_dir)
 #from drivers.swarm_driver import SwarmDriver
 #from drivers.k8s_driver import K8sDriver
 from drivers.nomad_driver import NomadDriver
+from utils.metrics import METRICS
+from utils.profiler import PROFILER
+from utils.results import ResultAggregator, clean_runs, list_results
+from utils.warehouse import ResultsWarehouse, new_run_id
 
 NUM_JOBS = 10
 JOB_DURATION = 5
 RESULTS_DIR = "/srv/nfs/cob_results"
 JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/throughput.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/throughput_trace.json")
 
 
 def run_test():
@@ -27,29 +31,41 @@ def run_test():
     driver = NomadDriver()
 
 
-    driver.clean_jobs()
-    os.system(f"rm -f {RESULTS_DIR}/*.json")
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        clean_runs(RESULTS_DIR)
+
+    METRICS.start("nomad", "burst_throughput", driver=driver)
+
+    # Risultati sharded in {RESULTS_DIR}/{run_id}/{shard}/ (vedi utils/results.py)
+    run_id = new_run_id("nomad", "burst_throughput")
 
     print("[TEST] Launching jobs...")
     start_time = time.time()
+    submission_times = {}
 
-    for i in range(NUM_JOBS):
-        job_id = f"burst-{i}"
-        driver.submit_job(job_id=job_id, job_type="cpu", duration=JOB_DURATION)
+    with PROFILER.span("submit", cat="phase"):
+        for i in range(NUM_JOBS):
+            job_id = f"burst-{i}"
+            submission_times[job_id] = time.time()
+            driver.submit_job(job_id=job_id, job_type="cpu", duration=JOB_DURATION, extra_env={"RUN_ID": run_id})
 
     launch_time = time.time() - start_time
     print(f"[TEST] All jobs submitted in {launch_time:.2f}s")
 
     # Polling
     print("[TEST] Waiting for completion...")
-    while True:
-        files = glob.glob(f"{RESULTS_DIR}/burst-*.json")
-        completed = len(files)
-        print(f"\rStatus: {completed}/{NUM_JOBS} finished...", end="")
-
-        if completed >= NUM_JOBS:
-            break
-        time.sleep(1)
+    with PROFILER.span("poll", cat="phase"):
+        while True:
+            with PROFILER.span("glob", cat="collect"):
+                files = list_results(RESULTS_DIR, run_id, prefix="burst-")
+            METRICS.observe_results(files)
+            completed = len(files)
+            print(f"\rStatus: {completed}/{NUM_JOBS} finished...", end="")
+
+            if completed >= NUM_JOBS:
+                break
+            PROFILER.sleep(1)
 
     total_time = time.time() - start_time
     throughput = NUM_JOBS / total_time
@@ -68,7 +84,8 @@ def run_test():
             "launch_overhead_seconds": round(launch_time, 4),
             "total_makespan_seconds": round(total_time, 4),
             "throughput_jobs_per_sec": round(throughput, 4)
-        }
+        },
+        "harness_overhead": PROFILER.overhead_summary()
     }
 
     os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
@@ -78,7 +95,18 @@ def run_test():
 
     print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
 
-    driver.clean_jobs()
+    # Archivia i risultati per-job prima che il prossimo test svuoti RESULTS_DIR
+    with PROFILER.span("collect", cat="phase"):
+        rows = ResultAggregator(RESULTS_DIR, run_id).aggregate(prefix="burst-")
+    warehouse = ResultsWarehouse()
+    warehouse.ingest_array(run_id, "nomad", "burst_throughput", rows,
+                           submission_times=submission_times, summary=output_data)
+    warehouse.close()
+
+    METRICS.stop()
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
 
 
 if __name__ == "__main__":
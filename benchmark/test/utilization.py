@@ -0,0 +1,139 @@
+import sys
+import os
+import time
+import json
+import random
+
+# Setup path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+#from drivers.swarm_driver import SwarmDriver
+#from drivers.k8s_driver import K8sDriver
+from drivers.nomad_driver import NomadDriver
+from utils.profiler import PROFILER
+from utils.results import clean_runs, list_results
+from utils.utilization import UtilizationAnalyzer
+from utils.warehouse import new_run_id
+
+# Mix di richieste CPU eterogenee: job da 3 CPU su nodi da 4 lasciano capacità "stranded"
+CPU_SIZES = [1, 2, 3]
+CPU_WEIGHTS = [0.4, 0.35, 0.25]
+DURATION_RANGE = (10, 30)
+# Lavoro offerto = LOAD_FACTOR x capacità totale scoperta (in CPU), per avere coda
+LOAD_FACTOR = 3.0
+SEED = 42
+TIMELINE_STEP = 1.0
+COMPLETION_TIMEOUT = 1200
+RESULTS_DIR = "/srv/nfs/cob_results"
+JSON_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/utilization.json")
+TRACE_OUTPUT_FILE = os.path.join(parent_dir, "results/nomad/utilization_trace.json")
+
+
+def run_test():
+    #driver = SwarmDriver()
+    #driver = K8sDriver()
+    driver = NomadDriver()
+
+    # Capacità dei nodi dal driver, non da valori fissi
+    nodes = driver.get_nodes()
+    if not nodes:
+        print("[ERROR] No schedulable nodes discovered.")
+        return
+    total_cpus = sum(n["cpus"] for n in nodes)
+    print(f"--- TEST: BIN-PACKING & UTILIZATION ({len(nodes)} nodes, {total_cpus:g} CPUs) ---")
+    for n in nodes:
+        print(f"  {n['name']}: {n['cpus']:g} CPU, {n['memory_mb']} MB")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+        clean_runs(RESULTS_DIR)
+
+    # Risultati sharded in {RESULTS_DIR}/{run_id}/{shard}/ (vedi utils/results.py)
+    run_id = new_run_id("nomad", "binpacking_utilization")
+
+    # Job finché le CPU richieste arrivano a LOAD_FACTOR x capacità
+    rng = random.Random(SEED)
+    jobs = []
+    requested = 0
+    while requested < LOAD_FACTOR * total_cpus:
+        cpus = rng.choices(CPU_SIZES, weights=CPU_WEIGHTS)[0]
+        jobs.append((f"util-{len(jobs)}", cpus, rng.randint(*DURATION_RANGE)))
+        requested += cpus
+
+    submission_times = {}
+    cpus_by_job = {}
+    print(f"[TEST] Submitting {len(jobs)} jobs ({requested} CPUs requested)...")
+    with PROFILER.span("submit", cat="phase"):
+        for job_id, cpus, duration in jobs:
+            submission_times[job_id] = time.time()
+            if driver.submit_job(job_id=job_id, job_type="sleep", duration=duration, cpu_reservation=str(cpus),
+                                 extra_env={"RUN_ID": run_id}):
+                cpus_by_job[job_id] = cpus
+
+    deadline = time.time() + COMPLETION_TIMEOUT
+    with PROFILER.span("poll", cat="phase"):
+        while time.time() < deadline:
+            files = list_results(RESULTS_DIR, run_id, prefix="util-")
+            print(f"\rStatus: {len(files)}/{len(cpus_by_job)} finished...", end="")
+            if len(files) >= len(cpus_by_job):
+                break
+            PROFILER.sleep(2)
+    print()
+
+    analyzer = UtilizationAnalyzer(nodes, step=TIMELINE_STEP)
+    with PROFILER.span("collect", cat="phase"):
+        loaded = analyzer.load_results(RESULTS_DIR, run_id, "util-", submission_times, cpus_by_job)
+    with PROFILER.span("analyze", cat="phase"):
+        report = analyzer.analyze()
+
+    if not report:
+        print("[ERROR] No results to analyze.")
+        driver.clean_jobs()
+        return
+
+    frag = report["fragmentation"]
+    print("\n--- RESULTS ---")
+    print(f"Jobs analyzed:        {loaded}/{len(cpus_by_job)}")
+    print(f"Average utilization:  {report['avg_utilization'] * 100:.1f}%")
+    print(f"Makespan:             {report['makespan_seconds']:.1f}s "
+          f"(ideal >= {report['ideal_makespan_seconds']:.1f}s, ratio {report['makespan_ratio']:.2f})")
+    print(f"Idle while queued:    {frag['idle_while_queued_cpu_s']:.1f} CPU-s "
+          f"({frag['stranded_cpu_s']:.1f} stranded, fragmentation {frag['fragmentation_ratio'] * 100:.1f}%)")
+    for name, stats in report["nodes"].items():
+        flag = " OVERCOMMITTED" if stats["overcommitted"] else ""
+        print(f"  {name}: {stats['utilization'] * 100:.1f}% (peak {stats['peak_reserved_cpus']:g}/"
+              f"{stats['capacity_cpus']:g} CPU){flag}")
+
+    output_data = {
+        "test_name": "binpacking_utilization",
+        "orchestrator": "nomad",
+        "run_id": run_id,
+        "parameters": {
+            "cpu_sizes": CPU_SIZES,
+            "cpu_weights": CPU_WEIGHTS,
+            "duration_range": list(DURATION_RANGE),
+            "load_factor": LOAD_FACTOR,
+            "seed": SEED,
+            "num_jobs": len(jobs)
+        },
+        "nodes": nodes,
+        "resource_translation": driver.last_resources,
+        "results": report,
+        "harness_overhead": PROFILER.overhead_summary()
+    }
+
+    os.makedirs(os.path.dirname(JSON_OUTPUT_FILE), exist_ok=True)
+    with open(JSON_OUTPUT_FILE, "w") as f:
+        json.dump(output_data, f, indent=2)
+
+    print(f"[RESULT] Report saved to: {JSON_OUTPUT_FILE}")
+
+    with PROFILER.span("clean", cat="phase"):
+        driver.clean_jobs()
+    PROFILER.export_chrome_trace(TRACE_OUTPUT_FILE)
+
+
+if __name__ == "__main__":
+    run_test()
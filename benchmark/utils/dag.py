@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import collections
+
+from utils.profiler import PROFILER
+
+
+class DagJob:
+    def __init__(self, job_id, parents=(), job_type="sleep", duration=5, cpu_reservation=None, constraints=None):
+        self.job_id = job_id
+        self.parents = list(parents)
+        self.job_type = job_type
+        self.duration = duration
+        self.cpu_reservation = cpu_reservation
+        self.constraints = constraints
+
+
+class Dag:
+    """Workload a pipeline: ogni job parte solo quando i risultati di tutti i padri sono visibili"""
+
+    def __init__(self, name, jobs):
+        self.name = name
+        self.jobs = {job.job_id: job for job in jobs}
+        self.children = collections.defaultdict(list)
+        for job in jobs:
+            for parent in job.parents:
+                if parent not in self.jobs:
+                    raise ValueError(f"DAG {name}: job {job.job_id} depends on unknown job {parent}")
+                self.children[parent].append(job.job_id)
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        indegree = {jid: len(job.parents) for jid, job in self.jobs.items()}
+        ready = collections.deque(jid for jid, deg in indegree.items() if deg == 0)
+        order = []
+        while ready:
+            jid = ready.popleft()
+            order.append(jid)
+            for child in self.children[jid]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+        if len(order) != len(self.jobs):
+            raise ValueError(f"DAG {self.name} contains a cycle")
+        return order
+
+    def edges(self):
+        return [(parent, jid) for jid, job in self.jobs.items() for parent in job.parents]
+
+    def critical_path(self, durations):
+        """Ritorna (lunghezza, percorso) del cammino più lungo pesato con `durations[job_id]`"""
+        finish = {}
+        best_parent = {}
+        for jid in self.order:
+            job = self.jobs[jid]
+            start = 0.0
+            for parent in job.parents:
+                if finish[parent] > start:
+                    start = finish[parent]
+                    best_parent[jid] = parent
+            finish[jid] = start + durations[jid]
+
+        last = max(finish, key=finish.get)
+        path = [last]
+        while path[-1] in best_parent:
+            path.append(best_parent[path[-1]])
+        return finish[last], list(reversed(path))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Formato: {"name": ..., "jobs": [{"job_id": ..., "parents": [...], "duration": ...}, ...]}"""
+        jobs = [DagJob(j["job_id"], j.get("parents", []), j.get("job_type", "sleep"), j.get("duration", 5),
+                       j.get("cpu_reservation"), j.get("constraints")) for j in data["jobs"]]
+        return cls(data.get("name", "dag"), jobs)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+
+# --- Forme predefinite ---
+def chain(prefix, depth, duration=5, job_type="sleep"):
+    jobs = [DagJob(f"{prefix}-{i}", [f"{prefix}-{i - 1}"] if i else [], job_type, duration) for i in range(depth)]
+    return Dag(f"chain-{depth}", jobs)
+
+
+def fan_out_in(prefix, width, duration=5, job_type="sleep"):
+    """split -> `width` job paralleli -> merge"""
+    jobs = [DagJob(f"{prefix}-split", [], job_type, duration)]
+    jobs += [DagJob(f"{prefix}-map-{i}", [f"{prefix}-split"], job_type, duration) for i in range(width)]
+    jobs.append(DagJob(f"{prefix}-merge", [f"{prefix}-map-{i}" for i in range(width)], job_type, duration))
+    return Dag(f"fan-out-in-{width}", jobs)
+
+
+def layered(prefix, depth, width, duration=5, job_type="sleep"):
+    """`depth` stadi da `width` job, ogni job dipende da tutti quelli dello stadio precedente"""
+    jobs = []
+    for d in range(depth):
+        parents = [f"{prefix}-{d - 1}-{w}" for w in range(width)] if d else []
+        jobs += [DagJob(f"{prefix}-{d}-{w}", parents, job_type, duration) for w in range(width)]
+    return Dag(f"layered-{depth}x{width}", jobs)
+
+
+class DagRunner:
+    """Esegue un Dag tramite driver.submit_job() osservando i file risultato sul volume condiviso"""
+
+    def __init__(self, driver, dag, results_dir, poll_interval=0.2, timeout=1800):
+        self.driver = driver
+        self.dag = dag
+        self.results_dir = results_dir
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.submit_ts = {}
+        self.observed_ts = {}  # quando l'harness ha visto il risultato
+        self.results = {}
+        self.failed = set()
+
+    def _submit(self, jid):
+        job = self.dag.jobs[jid]
+        self.submit_ts[jid] = time.time()
+        ok = self.driver.submit_job(job_id=jid, job_type=job.job_type, duration=job.duration,
+                                    cpu_reservation=job.cpu_reservation, constraints=job.constraints)
+        if not ok:
+            self.failed.add(jid)
+        return ok
+
+    def _read_result(self, jid):
+        fpath = os.path.join(self.results_dir, f"{jid}.json")
+        if not os.path.exists(fpath):
+            return None
+        try:
+            with open(fpath, "r") as f:
+                return json.load(f)
+        except ValueError:
+            return None  # File ancora in scrittura
+
+    def run(self):
+        remaining_parents = {jid: set(job.parents) for jid, job in self.dag.jobs.items()}
+        running = set()
+
+        with PROFILER.span("submit", cat="phase", dag=self.dag.name):
+            for jid in self.dag.order:
+                if not remaining_parents[jid] and self._submit(jid):
+                    running.add(jid)
+
+        deadline = time.time() + self.timeout
+        with PROFILER.span("poll", cat="phase", dag=self.dag.name):
+            while running and time.time() < deadline:
+                # Controlla solo i job in volo: niente glob su tutta la directory
+                for jid in list(running):
+                    data = self._read_result(jid)
+                    if data is None:
+                        continue
+                    self.observed_ts[jid] = time.time()
+                    self.results[jid] = data
+                    running.discard(jid)
+                    if data.get("status") != "completed":
+                        self.failed.add(jid)
+                        continue
+                    for child in self.dag.children[jid]:
+                        remaining_parents[child].discard(jid)
+                        if not remaining_parents[child] and self._submit(child):
+                            running.add(child)
+
+                print(f"\r[DAG {self.dag.name}] {len(self.results)}/{len(self.dag.jobs)} finished...", end="")
+                if running:
+                    PROFILER.sleep(self.poll_interval)
+        print()
+
+        if running:
+            print(f"[DAG {self.dag.name}] Timeout: {len(running)} jobs still running")
+        return self.analyze()
+
+    def analyze(self):
+        with PROFILER.span("analyze", cat="phase", dag=self.dag.name):
+            edges = []
+            for parent, child in self.dag.edges():
+                if parent not in self.results or child not in self.results:
+                    continue
+                p_end = self.results[parent]["end_ts"]
+                edges.append({
+                    "parent": parent,
+                    "child": child,
+                    # fine padre -> avvio figlio (include il lag di osservazione dell'harness)
+                    "dispatch_latency": round(self.results[child]["start_ts"] - p_end, 4),
+                    "detect_lag": round(self.observed_ts[parent] - p_end, 4),
+                    "submit_to_start": round(self.results[child]["start_ts"] - self.submit_ts[child], 4)
+                })
+
+            complete = len(self.results) == len(self.dag.jobs) and not self.failed
+            summary = {
+                "dag": self.dag.name,
+                "num_jobs": len(self.dag.jobs),
+                "num_edges": len(self.dag.edges()),
+                "completed": len(self.results),
+                "failed": sorted(self.failed),
+                "edges": edges
+            }
+            if edges:
+                latencies = sorted(e["dispatch_latency"] for e in edges)
+                summary["dispatch_latency_avg"] = round(sum(latencies) / len(latencies), 4)
+                summary["dispatch_latency_max"] = latencies[-1]
+
+            if complete:
+                ideal, ideal_path = self.dag.critical_path({j: float(job.duration) for j, job in self.dag.jobs.items()})
+                first_submit = min(self.submit_ts.values())
+                last_end = max(r["end_ts"] for r in self.results.values())
+                actual = last_end - first_submit
+                # Cammino critico osservato: a ritroso dall'ultimo job finito, seguendo il padre finito per ultimo
+                actual_path = [max(self.results, key=lambda j: self.results[j]["end_ts"])]
+                while self.dag.jobs[actual_path[-1]].parents:
+                    parents = self.dag.jobs[actual_path[-1]].parents
+                    actual_path.append(max(parents, key=lambda j: self.results[j]["end_ts"]))
+                actual_path.reverse()
+                path_edges = set(zip(actual_path, actual_path[1:]))
+                critical_edges = [e for e in edges if (e["parent"], e["child"]) in path_edges]
+                summary.update({
+                    "ideal_makespan": round(ideal, 4),
+                    "actual_makespan": round(actual, 4),
+                    "makespan_gap": round(actual - ideal, 4),
+                    "ideal_critical_path": ideal_path,
+                    "actual_critical_path": actual_path,
+                    "critical_path_dispatch_total": round(sum(e["dispatch_latency"] for e in critical_edges), 4)
+                })
+        return summary
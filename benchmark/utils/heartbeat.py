@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import socket
+import statistics
+import threading
+import collections
+
+DEFAULT_HEARTBEAT_PORT = int(os.environ.get("COB_HEARTBEAT_PORT", "9400"))
+# Indirizzo del cluster usato per scoprire l'interfaccia dell'harness (registry delle immagini)
+CLUSTER_PROBE_ADDR = "192.168.15.9"
+
+
+def advertise_host(probe=CLUSTER_PROBE_ADDR):
+    """IP dell'harness raggiungibile dai nodi: COB_HEARTBEAT_HOST, altrimenti l'interfaccia
+    usata per raggiungere il cluster (connect UDP: non invia pacchetti)"""
+    host = os.environ.get("COB_HEARTBEAT_HOST")
+    if host:
+        return host
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.connect((probe, 9))
+        return sock.getsockname()[0]
+    except OSError:
+        return socket.gethostbyname(socket.gethostname())
+    finally:
+        sock.close()
+
+
+class HeartbeatCollector:
+    """Riceve gli heartbeat UDP dei worker (HEARTBEAT_ADDR) e tiene, per ogni job, il tasso
+    di progresso (iterazioni/s) e la frazione di CPU ottenuta (CPU-s/s) su una finestra mobile.
+
+    `check()` confronta ogni job attivo con la mediana della sua coorte (job attivi dello
+    stesso tipo con la finestra già piena, così il warm-up non pesa): un job che resta sotto
+    `straggler_ratio` x mediana per `sustain_after` intervalli è uno straggler. Il flag è
+    rivalutato a ogni check e ogni episodio registra inizio e fine (`flagged_at`/`cleared_at`).
+    I job che smettono di inviare heartbeat per `silent_after` intervalli sono segnalati come
+    "silent" (container congelato/descheduled o nodo irraggiungibile); il flag si chiude al
+    primo heartbeat ricevuto dopo, e anche qui ogni episodio ha inizio e fine.
+    """
+
+    def __init__(self, bind="0.0.0.0", port=DEFAULT_HEARTBEAT_PORT, interval=1.0, window=5,
+                 straggler_ratio=0.5, min_cohort=3, silent_after=5, sustain_after=3, max_samples=3600):
+        self.bind = bind
+        self.port = port
+        self.interval = interval
+        self.window = window
+        self.straggler_ratio = straggler_ratio
+        self.min_cohort = min_cohort
+        self.silent_after = silent_after
+        self.sustain_after = sustain_after
+        self.max_samples = max_samples
+        self.jobs = {}
+        self.stragglers = {}
+        self.silent = {}
+        self.packets = 0
+        self.bytes = 0
+        self.malformed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = None
+        self.t0 = time.time()
+
+    # --- Ricezione ---
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self.bind, self.port))
+        self.port = self._sock.getsockname()[1]
+        self._sock.settimeout(0.5)
+        self.t0 = time.time()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        print(f"[HEARTBEAT] Listening on udp {self.bind}:{self.port}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._sock:
+            self._sock.close()
+
+    def worker_env(self):
+        """Variabili da passare ai job (extra_env) per attivare gli heartbeat"""
+        return {"HEARTBEAT_ADDR": f"{advertise_host()}:{self.port}", "HEARTBEAT_INTERVAL": self.interval}
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                data, _ = self._sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                msg = json.loads(data)
+                self._observe(msg, time.time())
+            except (ValueError, KeyError, TypeError):
+                self.malformed += 1
+                continue
+            self.packets += 1
+            self.bytes += len(data)
+
+    def _observe(self, msg, now):
+        key = msg["j"]
+        with self._lock:
+            state = self.jobs.get(key)
+            if state is None:
+                state = {
+                    "node": msg["n"],
+                    "job_type": msg["y"],
+                    "first_seen": now,
+                    "last_seen": now,
+                    "last_seq": -1,
+                    "lost": 0,
+                    "done": False,
+                    "rate": None,
+                    "cpu_share": None,
+                    # Inizio del periodo corrente sotto soglia (None se il job è in linea)
+                    "slow_since": None,
+                    # (t monotonic del worker, iterazioni, cpu): il tasso si calcola sui delta
+                    # dello stesso worker, quindi gli orologi dei nodi non devono essere allineati
+                    "recent": collections.deque(maxlen=self.window + 1),
+                    "samples": collections.deque(maxlen=self.max_samples)
+                }
+                self.jobs[key] = state
+            if msg["s"] <= state["last_seq"]:
+                return  # duplicato o fuori ordine
+            state["lost"] += msg["s"] - state["last_seq"] - 1
+            # Heartbeat di nuovo in arrivo: chiude l'episodio silent aperto (perdita UDP breve,
+            # container scongelato)
+            episode = self._open_silent(key)
+            if episode is not None:
+                episode["resumed_at"] = round(now - self.t0, 3)
+                self.silent[key]["silent_s"] = round(
+                    self.silent[key]["silent_s"] + episode["resumed_at"] - episode["last_seen"], 3)
+            state["last_seq"] = msg["s"]
+            state["last_seen"] = now
+            state["done"] = bool(msg.get("f"))
+            state["recent"].append((msg["t"], msg["i"], msg["c"]))
+
+            if len(state["recent"]) >= 2:
+                t_a, i_a, c_a = state["recent"][0]
+                t_b, i_b, c_b = state["recent"][-1]
+                dt = t_b - t_a
+                if dt > 0:
+                    state["rate"] = (i_b - i_a) / dt
+                    state["cpu_share"] = (c_b - c_a) / dt
+                    state["samples"].append((round(now - self.t0, 3), round(state["rate"], 4),
+                                             round(state["cpu_share"], 4)))
+
+    # --- Analisi in tempo reale ---
+    def _open_silent(self, key):
+        episodes = self.silent.get(key, {}).get("episodes")
+        if episodes and episodes[-1]["resumed_at"] is None:
+            return episodes[-1]
+        return None
+
+    def _open_episode(self, key):
+        episodes = self.stragglers.get(key, {}).get("episodes")
+        if episodes and episodes[-1]["cleared_at"] is None:
+            return episodes[-1]
+        return None
+
+    def _clear(self, key, state, now):
+        """Chiude l'eventuale episodio aperto; ritorna True se il job era segnalato"""
+        state["slow_since"] = None
+        episode = self._open_episode(key)
+        if episode is None:
+            return False
+        episode["cleared_at"] = round(now - self.t0, 3)
+        self.stragglers[key]["straggling_s"] = round(
+            self.stragglers[key]["straggling_s"] + episode["cleared_at"] - episode["flagged_at"], 3)
+        return True
+
+    def check(self):
+        """Aggiorna straggler e job silenziosi; ritorna la lista dei cambi di stato
+        ("straggler", "cleared" o "silent", job, nodo)"""
+        now = time.time()
+        changes = []
+        with self._lock:
+            cohorts = collections.defaultdict(list)
+            for key, state in self.jobs.items():
+                if state["done"]:
+                    self._clear(key, state, state["last_seen"])
+                    continue
+                if now - state["last_seen"] > self.silent_after * self.interval:
+                    self._clear(key, state, state["last_seen"])
+                    if self._open_silent(key) is None:
+                        record = self.silent.setdefault(key, {"node": state["node"], "silent_s": 0.0,
+                                                              "episodes": []})
+                        record["episodes"].append({"last_seen": round(state["last_seen"] - self.t0, 3),
+                                                   "flagged_at": round(now - self.t0, 3),
+                                                   "resumed_at": None})
+                        changes.append(("silent", key, state["node"]))
+                    continue
+                # In coorte solo a finestra piena: i primi campioni includono avvio e import
+                if state["rate"] is not None and len(state["recent"]) > self.window:
+                    cohorts[state["job_type"]].append((key, state))
+
+            for job_type, members in cohorts.items():
+                if len(members) < self.min_cohort:
+                    continue
+                median = statistics.median(s["rate"] for _, s in members)
+                if median <= 0:
+                    continue
+                for key, state in members:
+                    if state["rate"] >= self.straggler_ratio * median:
+                        if self._clear(key, state, now):
+                            changes.append(("cleared", key, state["node"]))
+                        continue
+                    if state["slow_since"] is None:
+                        state["slow_since"] = now
+                    episode = self._open_episode(key)
+                    if episode is not None:
+                        episode["rate_min"] = round(min(episode["rate_min"], state["rate"]), 4)
+                    elif now - state["slow_since"] >= self.sustain_after * self.interval:
+                        # Lento per sustain_after intervalli consecutivi: nuovo episodio
+                        record = self.stragglers.setdefault(key, {"node": state["node"], "straggling_s": 0.0,
+                                                                  "episodes": []})
+                        record["episodes"].append({
+                            "slow_since": round(state["slow_since"] - self.t0, 3),
+                            "flagged_at": round(now - self.t0, 3),
+                            "cleared_at": None,
+                            "rate_min": round(state["rate"], 4),
+                            "cohort_median": round(median, 4),
+                            "cpu_share": round(state["cpu_share"], 4)
+                        })
+                        changes.append(("straggler", key, state["node"]))
+
+        for kind, key, node in changes:
+            print(f"\n[HEARTBEAT] {kind.upper()}: {key} on {node}")
+        return changes
+
+    def active_stragglers(self):
+        """Job con un episodio straggler ancora aperto"""
+        with self._lock:
+            return [key for key in self.stragglers if self._open_episode(key) is not None]
+
+    def active_silent(self):
+        """Job ancora silenziosi (episodio silent non chiuso)"""
+        with self._lock:
+            return [key for key in self.silent if self._open_silent(key) is not None]
+
+    # --- Report ---
+    def summary(self):
+        with self._lock:
+            per_job = {}
+            per_node = collections.defaultdict(list)
+            for key, state in self.jobs.items():
+                rates = [r for _, r, _ in state["samples"]]
+                shares = [c for _, _, c in state["samples"]]
+                per_job[key] = {
+                    "node": state["node"],
+                    "job_type": state["job_type"],
+                    "heartbeats": state["last_seq"] + 1,
+                    "lost": state["lost"],
+                    "rate_mean": round(statistics.fmean(rates), 4) if rates else None,
+                    "rate_min": round(min(rates), 4) if rates else None,
+                    "cpu_share_mean": round(statistics.fmean(shares), 4) if shares else None,
+                    "straggler": key in self.stragglers,
+                    "straggling_s": self.stragglers[key]["straggling_s"] if key in self.stragglers else 0.0
+                }
+                if rates:
+                    per_node[state["node"]].append(statistics.fmean(rates))
+
+            # Progresso per nodo: la dispersione tra nodi mostra gli effetti della co-locazione
+            nodes = {
+                node: {
+                    "jobs": len(rates),
+                    "rate_mean": round(statistics.fmean(rates), 4),
+                    "rate_stdev": round(statistics.pstdev(rates), 4)
+                }
+                for node, rates in per_node.items()
+            }
+            return {
+                "jobs": per_job,
+                "nodes": nodes,
+                "stragglers": {key: dict(rec, episodes=[dict(e) for e in rec["episodes"]])
+                               for key, rec in self.stragglers.items()},
+                "silent": {key: dict(rec, episodes=[dict(e) for e in rec["episodes"]])
+                           for key, rec in self.silent.items()},
+                "packets": self.packets,
+                "bytes": self.bytes,
+                "malformed": self.malformed,
+                "lost": sum(s["lost"] for s in self.jobs.values())
+            }
+
+    def timelines(self):
+        """{job: [[t, rate, cpu_share], ...]} con t relativo all'avvio del collector"""
+        with self._lock:
+            return {key: [list(s) for s in state["samples"]] for key, state in self.jobs.items()}
@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import importlib
+import threading
+import multiprocessing
+
+# Nome driver -> (modulo, classe). Gli agent istanziano il proprio driver a partire da qui.
+DRIVERS = {
+    "swarm": ("drivers.swarm_driver", "SwarmDriver"),
+    "k8s": ("drivers.k8s_driver", "K8sDriver"),
+    "nomad": ("drivers.nomad_driver", "NomadDriver"),
+    "docker": ("drivers.docker_driver", "DockerDriver"),
+    "stub": ("drivers.stub_driver", "StubDriver")
+}
+
+DEFAULT_PORT = 9300
+# Anticipo con cui il coordinator fissa l'istante di partenza comune dopo la barriera
+START_LEAD = 2.0
+
+
+def make_driver(name, kwargs=None):
+    module_name, class_name = DRIVERS[name]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)(**(kwargs or {}))
+
+
+def _send(wfile, msg):
+    wfile.write(json.dumps(msg) + "\n")
+    wfile.flush()
+
+
+# --- Agent ---
+def run_agent(coordinator, agent_id=None):
+    """Processo agent: riceve la sua quota di job, aspetta la barriera e li sottomette
+    con il proprio driver, inviando al coordinator un record per ogni job."""
+    host, port = coordinator.rsplit(":", 1)
+    agent_id = agent_id or f"{socket.gethostname()}-{os.getpid()}"
+    sock = socket.create_connection((host, int(port)))
+    rfile = sock.makefile("r")
+    wfile = sock.makefile("w")
+
+    _send(wfile, {"type": "hello", "agent": agent_id, "host": socket.gethostname()})
+
+    driver = None
+    jobs = []
+    for line in rfile:
+        msg = json.loads(line)
+        kind = msg["type"]
+
+        if kind == "ping":
+            # Stima dell'offset di clock lato coordinator
+            _send(wfile, {"type": "pong", "ts": time.time()})
+
+        elif kind == "assign":
+            driver = make_driver(msg["driver"], msg.get("driver_args"))
+            jobs = msg["jobs"]
+            _send(wfile, {"type": "ready", "jobs": len(jobs)})
+
+        elif kind == "start":
+            # start_at è già convertito nell'orologio locale dell'agent
+            delay = msg["start_at"] - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            for job in jobs:
+                submit_ts = time.time()
+                ok = driver.submit_job(**job)
+                _send(wfile, {"type": "job", "job_id": job["job_id"], "submit_ts": submit_ts,
+                              "ack_ts": time.time(), "ok": bool(ok),
+                              "error": getattr(driver, "last_error", None)})
+            _send(wfile, {"type": "done"})
+            break
+
+    sock.close()
+
+
+# --- Coordinator ---
+class _AgentConn:
+    def __init__(self, sock):
+        self.sock = sock
+        self.rfile = sock.makefile("r")
+        self.wfile = sock.makefile("w")
+        self.agent_id = None
+        self.host = None
+        self.offset = 0.0  # clock agent - clock coordinator
+        self.records = []
+
+    def recv(self):
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError(f"Agent {self.agent_id} disconnected")
+        return json.loads(line)
+
+    def send(self, msg):
+        _send(self.wfile, msg)
+
+    def estimate_offset(self, rounds=5):
+        """Offset NTP-style: si tiene il campione con RTT minimo"""
+        best_rtt = None
+        for _ in range(rounds):
+            t0 = time.time()
+            self.send({"type": "ping"})
+            reply = self.recv()
+            t1 = time.time()
+            rtt = t1 - t0
+            if best_rtt is None or rtt < best_rtt:
+                best_rtt = rtt
+                self.offset = reply["ts"] - (t0 + t1) / 2
+        return best_rtt
+
+
+class LoadCoordinator:
+    """Divide una lista di job tra M agent (processi locali e/o agent remoti già avviati),
+    li sincronizza con una barriera e unisce i timestamp per-job che gli agent inviano.
+
+    I timestamp degli agent sono riportati sull'orologio del coordinator usando l'offset
+    stimato con un ping/pong all'handshake.
+    """
+
+    def __init__(self, driver_name, driver_args=None, local_agents=2, remote_agents=0,
+                 bind="0.0.0.0", port=DEFAULT_PORT):
+        self.driver_name = driver_name
+        self.driver_args = driver_args or {}
+        self.local_agents = local_agents
+        self.remote_agents = remote_agents
+        self.bind = bind
+        self.port = port
+        self.agents = []
+        self.start_at = None
+
+    def run(self, jobs, accept_timeout=60):
+        """`jobs`: lista di dict con gli argomenti di submit_job (job_id obbligatorio)"""
+        total_agents = self.local_agents + self.remote_agents
+        server = socket.create_server((self.bind, self.port))
+        server.settimeout(accept_timeout)
+        port = server.getsockname()[1]
+        print(f"[LOADGEN] Coordinator listening on {self.bind}:{port}, waiting for {total_agents} agents...")
+
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=run_agent, args=(f"127.0.0.1:{port}", f"local-{i}"), daemon=True)
+                 for i in range(self.local_agents)]
+        for p in procs:
+            p.start()
+
+        # 1. Handshake e stima offset
+        while len(self.agents) < total_agents:
+            sock, _ = server.accept()
+            conn = _AgentConn(sock)
+            hello = conn.recv()
+            conn.agent_id = hello["agent"]
+            conn.host = hello["host"]
+            rtt = conn.estimate_offset()
+            print(f"[LOADGEN] Agent {conn.agent_id} ({conn.host}) connected, "
+                  f"offset {conn.offset * 1000:.2f} ms, rtt {rtt * 1000:.2f} ms")
+            self.agents.append(conn)
+        server.close()
+
+        # 2. Assegnazione round-robin
+        shares = [jobs[i::total_agents] for i in range(total_agents)]
+        for conn, share in zip(self.agents, shares):
+            conn.send({"type": "assign", "driver": self.driver_name, "driver_args": self.driver_args,
+                       "jobs": share})
+
+        # 3. Barriera: tutti pronti (driver istanziato), poi partenza comune
+        for conn in self.agents:
+            msg = conn.recv()
+            if msg["type"] != "ready":
+                raise RuntimeError(f"Unexpected message from {conn.agent_id}: {msg}")
+        self.start_at = time.time() + START_LEAD
+        for conn in self.agents:
+            conn.send({"type": "start", "start_at": self.start_at + conn.offset})
+
+        # 4. Raccolta dei record in streaming (un thread per agent)
+        threads = [threading.Thread(target=self._collect, args=(conn,)) for conn in self.agents]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for p in procs:
+            p.join(timeout=10)
+
+        return self.merged_records()
+
+    def _collect(self, conn):
+        while True:
+            msg = conn.recv()
+            if msg["type"] == "done":
+                break
+            if msg["type"] == "job":
+                # Riporta i timestamp sull'orologio del coordinator
+                msg["submit_ts"] -= conn.offset
+                msg["ack_ts"] -= conn.offset
+                msg["agent"] = conn.agent_id
+                conn.records.append(msg)
+        conn.sock.close()
+
+    def merged_records(self):
+        records = [r for conn in self.agents for r in conn.records]
+        records.sort(key=lambda r: r["submit_ts"])
+        return records
+
+    def agent_stats(self):
+        stats = []
+        for conn in self.agents:
+            if not conn.records:
+                stats.append({"agent": conn.agent_id, "host": conn.host, "jobs": 0})
+                continue
+            first = min(r["submit_ts"] for r in conn.records)
+            last = max(r["ack_ts"] for r in conn.records)
+            stats.append({
+                "agent": conn.agent_id,
+                "host": conn.host,
+                "jobs": len(conn.records),
+                "rejected": sum(1 for r in conn.records if not r["ok"]),
+                "clock_offset_ms": round(conn.offset * 1000, 3),
+                "start_delay_ms": round((first - self.start_at) * 1000, 3),
+                "submit_rate": round(len(conn.records) / (last - first), 4) if last > first else None
+            })
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="COB-Job distributed load generator agent")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_agent = sub.add_parser("agent", help="Connect to a coordinator and submit the assigned jobs")
+    p_agent.add_argument("--coordinator", required=True, help="host:port of the coordinator")
+    p_agent.add_argument("--agent-id")
+    args = parser.parse_args(argv)
+
+    if args.command == "agent":
+        run_agent(args.coordinator, args.agent_id)
+    return 0
+
+
+if __name__ == "__main__":
+    # Avviato come script (agent remoto): rende importabili drivers/ e utils/
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.exit(main())
@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.profiler import PROFILER
+
+# Porta di default dell'endpoint /metrics (sovrascrivibile con COB_METRICS_PORT, 0 = disabilitato)
+DEFAULT_METRICS_PORT = int(os.environ.get("COB_METRICS_PORT", "9109"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+
+def _fmt_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "unknown"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def render(self, const_names, const_values):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self, const_names, const_values):
+        lines = [f"# TYPE {self.name} counter", f"# HELP {self.name} {self.help_text}"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lbl = _fmt_labels(const_names + self.labelnames, const_values + labels)
+            lines.append(f"{self.name}_total{lbl} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+    def replace(self, values):
+        """Sostituisce in blocco tutte le serie (es. distribuzione per nodo)"""
+        with self._lock:
+            self._values = dict(values)
+
+    def render(self, const_names, const_values):
+        lines = [f"# TYPE {self.name} gauge", f"# HELP {self.name} {self.help_text}"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lbl = _fmt_labels(const_names + self.labelnames, const_values + labels)
+            lines.append(f"{self.name}{lbl} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        # Bucket non cumulativi: la somma cumulativa si calcola solo in render()
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            state[0][idx] += 1
+            state[1] += 1
+            state[2] += value
+
+    def render(self, const_names, const_values):
+        lines = [f"# TYPE {self.name} histogram", f"# HELP {self.name} {self.help_text}"]
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        names = const_names + self.labelnames
+        for labels, (counts, count, total) in items:
+            values = const_values + labels
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lbl = _fmt_labels(names + ("le",), values + (le,))
+                lines.append(f"{self.name}_bucket{lbl} {cumulative}")
+            lbl = _fmt_labels(names, values)
+            lines.append(f"{self.name}_count{lbl} {count}")
+            lines.append(f"{self.name}_sum{lbl} {total}")
+        return lines
+
+
+class BenchmarkMetrics:
+    """Registro delle metriche live di un run, esposto in formato OpenMetrics su /metrics.
+
+    Le label `orchestrator` e `scenario` sono costanti per tutto il run e vengono
+    aggiunte solo in fase di render, così l'aggiornamento per-submission resta economico.
+    """
+
+    def __init__(self):
+        self.orchestrator = "unknown"
+        self.scenario = "unknown"
+        # Job logici (un job ritentato conta una volta) e tentativi (ogni chiamata a submit_job)
+        self.submissions = Counter("cob_submissions", "Jobs submitted to the orchestrator (retries excluded)")
+        self.submit_errors = Counter("cob_submit_errors", "Jobs finally rejected after all attempts")
+        self.submit_attempts = Counter("cob_submit_attempts", "Driver submit_job calls, retries included")
+        self.submit_attempt_errors = Counter("cob_submit_attempt_errors", "Driver submit_job calls that failed")
+        self.submit_retries = Counter("cob_submit_retries", "Submissions retried after a retryable error",
+                                      labelnames=("category",))
+        self.submit_latency = Histogram("cob_submit_latency_seconds", "Wall time of a driver submit_job call")
+        self.completions = Counter("cob_completions", "Job results collected from the shared volume")
+        self.collection_lag = Histogram("cob_result_collection_lag_seconds",
+                                        "Delay between worker end_ts and the harness observing the result",
+                                        buckets=LAG_BUCKETS)
+        self.jobs_running = Gauge("cob_jobs_running", "Jobs running per node", labelnames=("node",))
+        self.jobs_pending = Gauge("cob_jobs_pending", "Submitted jobs neither running nor completed")
+        self._metrics = [self.submissions, self.submit_errors, self.submit_attempts, self.submit_attempt_errors,
+                         self.submit_retries, self.submit_latency,
+                         self.completions, self.collection_lag, self.jobs_running, self.jobs_pending]
+        self._seen_results = set()
+        self._server = None
+        self._poller = None
+        self._stop = threading.Event()
+        self._local = threading.local()
+
+    # --- Aggiornamento (hot path) ---
+    def observe_submit(self, latency, ok):
+        """Un tentativo di submit; conta anche come job se non è gestito da un job_scope()"""
+        self.submit_attempts.inc()
+        self.submit_latency.observe(latency)
+        if not ok:
+            self.submit_attempt_errors.inc()
+        if not getattr(self._local, "in_job", False):
+            self.observe_job(ok)
+
+    def observe_job(self, ok):
+        self.submissions.inc()
+        if not ok:
+            self.submit_errors.inc()
+
+    @contextlib.contextmanager
+    def job_scope(self):
+        """Dentro il blocco i submit contano solo come tentativi: chi ritenta (SubmissionManager)
+        registra l'esito del job con observe_job() alla fine"""
+        previous = getattr(self._local, "in_job", False)
+        self._local.in_job = True
+        try:
+            yield
+        finally:
+            self._local.in_job = previous
+
+    def observe_results(self, paths):
+        """Conta i file risultato nuovi e misura il lag di raccolta (legge solo i file mai visti)"""
+        now = time.time()
+        for path in paths:
+            if path in self._seen_results:
+                continue
+            self._seen_results.add(path)
+            self.completions.inc()
+            try:
+                with open(path, "r") as f:
+                    end_ts = json.load(f).get("end_ts")
+            except (OSError, ValueError):
+                continue
+            if end_ts is not None:
+                self.collection_lag.observe(max(now - end_ts, 0.0))
+
+    def update_node_distribution(self, distribution):
+        self.jobs_running.replace({(node,): count for node, count in distribution.items()})
+        submitted = self.submissions.value() - self.submit_errors.value()
+        completed = self.completions.value()
+        running = sum(distribution.values())
+        self.jobs_pending.set(value=max(submitted - completed - running, 0))
+
+    # --- Esposizione ---
+    def render(self):
+        const_names = ("orchestrator", "scenario")
+        const_values = (self.orchestrator, self.scenario)
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(const_names, const_values))
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def start(self, orchestrator, scenario, driver=None, port=DEFAULT_METRICS_PORT, node_poll_interval=5.0):
+        """Avvia l'endpoint http://127.0.0.1:<port>/metrics in un thread daemon.
+
+        Se viene passato un driver, un secondo thread interroga get_node_distribution()
+        ogni `node_poll_interval` secondi per aggiornare i gauge running/pending.
+        """
+        self.orchestrator = orchestrator
+        self.scenario = scenario
+        if not port:
+            return
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        except OSError as e:
+            print(f"[METRICS] Could not bind port {port}: {e}. Live metrics disabled.")
+            return
+
+        self._stop.clear()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"[METRICS] Serving http://127.0.0.1:{port}/metrics")
+
+        if driver is not None:
+            self._poller = threading.Thread(target=self._poll_nodes, args=(driver, node_poll_interval), daemon=True)
+            self._poller.start()
+
+    def _poll_nodes(self, driver, interval):
+        # Il poll è un servizio dell'endpoint, non lavoro del benchmark: fuori dal profiler
+        with PROFILER.suspended():
+            while not self._stop.wait(interval):
+                try:
+                    self.update_node_distribution(driver.get_node_distribution())
+                except Exception as e:
+                    print(f"[METRICS] Node poll failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Istanza globale condivisa da driver e test
+METRICS = BenchmarkMetrics()
+
+
+def metered_submit(func):
+    """Decoratore per submit_job: registra tentativi, errori e latenza nel registro globale"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        ok = func(*args, **kwargs)
+        METRICS.observe_submit(time.perf_counter() - start, ok)
+        return ok
+    return wrapper
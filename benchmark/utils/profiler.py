@@ -0,0 +1,146 @@
+import os
+import time
+import json
+import threading
+import functools
+import contextlib
+import collections
+
+
+class HarnessProfiler:
+    """Misura l'overhead dell'harness (wall time + CPU time) per span nominati.
+
+    Ogni span registra un evento compatibile con il formato Chrome trace-event
+    ("ph": "X"), visualizzabile in chrome://tracing o Perfetto. I totali per span sono
+    aggiornati incrementalmente; gli eventi singoli sono tenuti fino a `max_events`
+    (oltre, vengono contati in `dropped_events`), così anche run da milioni di job
+    hanno memoria limitata.
+    """
+
+    def __init__(self, max_events=200000):
+        self.enabled = True
+        self.max_events = max_events
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        # Flag per-thread: i thread di servizio (es. poll dei nodi) non devono contare come overhead
+        self._local = threading.local()
+        self._events = []
+        self._totals = collections.defaultdict(lambda: [0, 0.0, 0.0, 0.0])  # count, wall, cpu, overshoot
+        self.dropped_events = 0
+        # Epoch comune per tutti gli eventi (microsecondi relativi)
+        self._t0 = time.perf_counter()
+
+    def reset(self):
+        with self._lock:
+            self._events = []
+            self._totals.clear()
+            self.dropped_events = 0
+        self._t0 = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name, cat="harness", **args):
+        if not self.enabled or getattr(self._local, "suspended", False):
+            yield args
+            return
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            # Il chiamante può aggiungere argomenti allo span durante l'esecuzione
+            yield args
+        finally:
+            cpu = time.thread_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+            with self._lock:
+                totals = self._totals[(cat, name)]
+                totals[0] += 1
+                totals[1] += wall
+                totals[2] += cpu
+                totals[3] += args.get("overshoot_us", 0.0) / 1e6
+                if len(self._events) < self.max_events:
+                    self._events.append({
+                        "name": name,
+                        "cat": cat,
+                        "ph": "X",
+                        "ts": (wall_start - self._t0) * 1e6,
+                        "dur": wall * 1e6,
+                        "pid": self.pid,
+                        "tid": threading.get_ident(),
+                        "args": dict(args, cpu_us=cpu * 1e6)
+                    })
+                else:
+                    self.dropped_events += 1
+
+    @contextlib.contextmanager
+    def suspended(self):
+        """Nessuno span registrato nel thread corrente dentro il blocco"""
+        previous = getattr(self._local, "suspended", False)
+        self._local.suspended = True
+        try:
+            yield
+        finally:
+            self._local.suspended = previous
+
+    def sleep(self, seconds, name="sleep"):
+        """time.sleep() strumentato: registra anche l'overshoot rispetto al richiesto"""
+        with self.span(name, cat="sleep", requested_s=seconds) as args:
+            start = time.perf_counter()
+            time.sleep(seconds)
+            args["overshoot_us"] = max(time.perf_counter() - start - seconds, 0.0) * 1e6
+
+    def summary(self):
+        """Ritorna {cat: {name: {count, wall_s, cpu_s}}} (overshoot_s per gli sleep)"""
+        with self._lock:
+            totals = {k: list(v) for k, v in self._totals.items()}
+
+        result = {}
+        for (cat, name), (count, wall, cpu, overshoot) in sorted(totals.items()):
+            stats = {
+                "count": count,
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6)
+            }
+            if cat == "sleep":
+                stats["overshoot_s"] = round(overshoot, 6)
+            result.setdefault(cat, {})[name] = stats
+        return result
+
+    def overhead_summary(self):
+        """Riassunto compatto da includere nei file di risultato dei test"""
+        summary = self.summary()
+        # CPU time dell'intero processo harness (include figli già terminati)
+        proc = os.times()
+        return {
+            "process_cpu_s": round(proc.user + proc.system, 4),
+            "children_cpu_s": round(proc.children_user + proc.children_system, 4),
+            "dropped_trace_events": self.dropped_events,
+            "spans": summary
+        }
+
+    def export_chrome_trace(self, path):
+        with self._lock:
+            events = list(self._events)
+
+        trace = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms"
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(trace, f)
+        print(f"[PROFILER] Trace saved to: {path}")
+
+
+# Istanza globale condivisa da driver e test
+PROFILER = HarnessProfiler()
+
+
+def profiled(name, cat="driver"):
+    """Decoratore: avvolge la funzione in uno span del profiler globale"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with PROFILER.span(name, cat=cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
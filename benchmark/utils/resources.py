@@ -0,0 +1,71 @@
+import math
+
+# Memoria richiesta quando il test non la specifica (era fissa nel driver Nomad)
+DEFAULT_MEMORY_MB = 256
+# MHz per core usati da Nomad solo se la scoperta dei nodi fallisce
+FALLBACK_CPU_MHZ = 2000
+
+
+class ResourceSpec:
+    """Richiesta di risorse comune a tutti i driver.
+
+    `cpu` e `memory_mb` sono le requests (usate dallo scheduler per il piazzamento),
+    `cpu_limit` e `memory_limit_mb` i limits (tetto a runtime). Le CPU sono in core.
+    Ogni driver la traduce nel formato nativo con `translate_resources()`.
+    """
+
+    def __init__(self, cpu=None, memory_mb=DEFAULT_MEMORY_MB, cpu_limit=None, memory_limit_mb=None):
+        self.cpu = _positive(cpu, "cpu")
+        self.memory_mb = _positive(memory_mb, "memory_mb")
+        self.cpu_limit = _positive(cpu_limit, "cpu_limit")
+        self.memory_limit_mb = _positive(memory_limit_mb, "memory_limit_mb")
+        if self.cpu_limit is not None and self.cpu is not None and self.cpu_limit < self.cpu:
+            raise ValueError(f"cpu_limit {self.cpu_limit} is lower than the cpu request {self.cpu}")
+        if self.memory_limit_mb is not None and self.memory_mb is not None and self.memory_limit_mb < self.memory_mb:
+            raise ValueError(f"memory_limit_mb {self.memory_limit_mb} is lower than the request {self.memory_mb}")
+
+    @classmethod
+    def from_args(cls, resources=None, cpu_reservation=None):
+        """Normalizza gli argomenti di submit_job: `resources` (ResourceSpec o dict)
+        ha la precedenza sul vecchio `cpu_reservation`"""
+        if isinstance(resources, cls):
+            return resources
+        if resources is not None:
+            return cls(**resources)
+        return cls(cpu=cpu_reservation)
+
+    def as_dict(self):
+        return {
+            "cpu": self.cpu,
+            "memory_mb": self.memory_mb,
+            "cpu_limit": self.cpu_limit,
+            "memory_limit_mb": self.memory_limit_mb
+        }
+
+
+def _positive(value, name):
+    if value is None or value == "":
+        return None
+    number = float(value)
+    if not math.isfinite(number) or number <= 0:
+        raise ValueError(f"{name} must be a positive number, got {value!r}")
+    return number
+
+
+def translation(orchestrator, spec, native, notes=None):
+    """Record della traduzione usata per un job (salvato nei risultati)"""
+    return {
+        "orchestrator": orchestrator,
+        "spec": spec.as_dict(),
+        "native": native,
+        "notes": notes or []
+    }
+
+
+def translation_env(record):
+    """Forma compatta "chiave=valore,..." passata al worker nella variabile RESOURCES.
+    Niente spazi né virgolette: deve passare intatta anche nei comandi shell dei driver."""
+    items = [("orchestrator", record["orchestrator"])]
+    items += [(key, val) for key, val in record["spec"].items() if val is not None]
+    items += [(f"native.{key}", val) for key, val in record["native"].items()]
+    return ",".join(f"{key}={val}" for key, val in items)
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import concurrent.futures
+
+import numpy as np
+
+# Layout sharded: {results_dir}/{run_id}/{shard}/{job_id}.json, shard = primi 2 hex di md5(job_id).
+# 256 directory per run: a 100k job sono ~400 file per directory invece di 100k in una sola.
+# Il worker (src/worker/worker.py) replica lo stesso calcolo: vanno tenuti allineati.
+SHARD_CHARS = 2
+
+# Una riga per job; stringhe a lunghezza fissa (bytes) per un file compatto e caricabile con mmap
+RESULT_DTYPE = np.dtype([
+    ("job_id", "S64"),
+    ("node", "S64"),
+    ("start_ts", "f8"),
+    ("end_ts", "f8"),
+    ("duration_real", "f8"),
+    ("status", "S16")
+])
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results/runs")
+CHUNK_SIZE = 2000
+
+
+def shard_of(job_id):
+    return hashlib.md5(str(job_id).encode()).hexdigest()[:SHARD_CHARS]
+
+
+def run_dir(results_dir, run_id):
+    return os.path.join(results_dir, run_id)
+
+
+def result_path(results_dir, run_id, job_id):
+    return os.path.join(results_dir, run_id, shard_of(job_id), f"{job_id}.json")
+
+
+def list_results(results_dir, run_id, prefix=""):
+    """Path dei file risultato di un run (scandir per shard, più leggero di glob su NFS)"""
+    paths = []
+    base = run_dir(results_dir, run_id)
+    try:
+        shards = [e.path for e in os.scandir(base) if e.is_dir()]
+    except FileNotFoundError:
+        return paths
+    for shard in shards:
+        with os.scandir(shard) as entries:
+            paths.extend(e.path for e in entries if e.name.endswith(".json") and e.name.startswith(prefix))
+    return paths
+
+
+def _is_run_dir(path):
+    """Un run contiene solo directory shard (SHARD_CHARS cifre esadecimali)"""
+    with os.scandir(path) as entries:
+        names = [(e.name, e.is_dir()) for e in entries]
+    return all(is_dir and len(name) == SHARD_CHARS and all(c in "0123456789abcdef" for c in name)
+               for name, is_dir in names)
+
+
+def clean_runs(results_dir, keep=0):
+    """Rimuove le directory dei run sharded in `results_dir` tranne le `keep` più recenti
+    (il vecchio `rm -f *.json` non scende nei run). Ritorna i run_id rimossi."""
+    try:
+        runs = [e for e in os.scandir(results_dir) if e.is_dir() and _is_run_dir(e.path)]
+    except FileNotFoundError:
+        return []
+    runs.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    removed = []
+    for entry in runs[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+        removed.append(entry.name)
+    if removed:
+        print(f"[RESULTS] Removed {len(removed)} old run directories from {results_dir}")
+    return removed
+
+
+def _parse_chunk(paths):
+    """Eseguito nei processi del pool: ritorna un array strutturato già compilato"""
+    chunk = np.zeros(len(paths), dtype=RESULT_DTYPE)
+    n = 0
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            continue
+        chunk[n] = (
+            str(data.get("job_id", "")).encode()[:64],
+            str(data.get("node", "")).encode()[:64],
+            data.get("start_ts") or np.nan,
+            data.get("end_ts") or np.nan,
+            data.get("duration_real") or np.nan,
+            str(data.get("status", "")).encode()[:16]
+        )
+        n += 1
+    return chunk[:n]
+
+
+class ResultAggregator:
+    """Legge i risultati di un run in parallelo (pool di processi) e li raccoglie in un
+    array strutturato NumPy preallocato, salvato come un solo file .npy per run."""
+
+    def __init__(self, results_dir, run_id, workers=None, chunk_size=CHUNK_SIZE, archive_dir=DEFAULT_ARCHIVE_DIR):
+        self.results_dir = results_dir
+        self.run_id = run_id
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.archive_dir = archive_dir
+        self.failed = 0
+        self.parse_seconds = None
+
+    def aggregate(self, prefix=""):
+        start = time.perf_counter()
+        paths = list_results(self.results_dir, self.run_id, prefix)
+        rows = np.empty(len(paths), dtype=RESULT_DTYPE)
+        chunks = [paths[i:i + self.chunk_size] for i in range(0, len(paths), self.chunk_size)]
+
+        filled = 0
+        if len(chunks) == 1:
+            # Pochi file: il pool costa più del parsing
+            parsed = _parse_chunk(chunks[0])
+            rows[:len(parsed)] = parsed
+            filled = len(parsed)
+        elif chunks:
+            with concurrent.futures.ProcessPoolExecutor(self.workers) as pool:
+                # I chunk vengono copiati nell'array man mano che arrivano
+                for parsed in pool.map(_parse_chunk, chunks):
+                    rows[filled:filled + len(parsed)] = parsed
+                    filled += len(parsed)
+
+        self.failed = len(paths) - filled
+        self.parse_seconds = time.perf_counter() - start
+        print(f"[RESULTS] Aggregated {filled} results of {self.run_id} in {self.parse_seconds:.2f}s"
+              + (f" ({self.failed} unreadable)" if self.failed else ""))
+        return rows[:filled]
+
+    def archive_path(self):
+        return os.path.join(self.archive_dir, f"{self.run_id}.npy")
+
+    def save(self, rows):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = self.archive_path()
+        np.save(path, rows)
+        return path
+
+
+def load_run(run_id, archive_dir=DEFAULT_ARCHIVE_DIR, mmap=True):
+    """Carica l'array di un run archiviato (memory-mapped: costo quasi nullo anche a 100k job)"""
+    return np.load(os.path.join(archive_dir, f"{run_id}.npy"), mmap_mode="r" if mmap else None)
+
+
+def lookup(rows, job_ids):
+    """Indici in `rows` dei job_id dati (-1 se mancanti), per allineare dati lato harness"""
+    keys = np.array([str(j).encode() for j in job_ids], dtype=RESULT_DTYPE["job_id"])
+    if len(rows) == 0:
+        return np.full(len(keys), -1)
+    order = np.argsort(rows["job_id"])
+    pos = np.minimum(np.searchsorted(rows["job_id"], keys, sorter=order), len(rows) - 1)
+    idx = order[pos]
+    return np.where(rows["job_id"][idx] == keys, idx, -1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="COB-Job sharded results aggregator")
+    parser.add_argument("results_dir")
+    parser.add_argument("run_id")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    aggregator = ResultAggregator(args.results_dir, args.run_id, workers=args.workers)
+    path = aggregator.save(aggregator.aggregate())
+    print(f"[RESULTS] Saved to: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
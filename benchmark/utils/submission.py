@@ -0,0 +1,150 @@
+import re
+import time
+import random
+import threading
+import collections
+
+from utils.metrics import METRICS
+from utils.profiler import PROFILER
+
+# Categorie di errore in fase di submit
+RATE_LIMITED = "rate_limited"
+QUOTA = "quota"
+VALIDATION = "validation"
+TRANSIENT = "transient"
+UNKNOWN = "unknown"
+
+# L'ordine conta: la prima categoria che matcha vince
+_ERROR_PATTERNS = [
+    (RATE_LIMITED, re.compile(r"\b429\b|too many requests|rate.?limit|throttl", re.IGNORECASE)),
+    (QUOTA, re.compile(r"exceeded quota|quota exceeded|resourcequota|insufficient|no space", re.IGNORECASE)),
+    (VALIDATION, re.compile(r"invalid|validation|is not valid|must be|unknown flag|failed to parse|"
+                            r"already exists|\b400\b|\b422\b|unprocessable", re.IGNORECASE)),
+    (TRANSIENT, re.compile(r"\b50[0234]\b|timeout|timed out|deadline exceeded|connection refused|"
+                           r"connection reset|\bEOF\b|temporarily unavailable|try again|"
+                           r"no leader|i/o timeout|server is currently unable", re.IGNORECASE)),
+]
+
+RETRYABLE = (RATE_LIMITED, TRANSIENT)
+
+
+def classify_error(stderr):
+    """Ritorna la categoria di un errore di submit a partire dallo stderr della CLI"""
+    text = stderr or ""
+    for category, pattern in _ERROR_PATTERNS:
+        if pattern.search(text):
+            return category
+    return UNKNOWN
+
+
+class RetryPolicy:
+    """Backoff esponenziale con full jitter: sleep = uniform(0, min(max_delay, base * factor^n))"""
+
+    def __init__(self, max_retries=5, base_delay=0.2, factor=2.0, max_delay=10.0, jitter=True,
+                 retry_on=RETRYABLE):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_on = tuple(retry_on)
+
+    def delay(self, attempt):
+        cap = min(self.max_delay, self.base_delay * (self.factor ** attempt))
+        return random.uniform(0, cap) if self.jitter else cap
+
+    def as_dict(self):
+        return {
+            "max_retries": self.max_retries,
+            "base_delay": self.base_delay,
+            "factor": self.factor,
+            "max_delay": self.max_delay,
+            "jitter": self.jitter,
+            "retry_on": list(self.retry_on)
+        }
+
+
+NO_RETRY = RetryPolicy(max_retries=0)
+
+
+class SubmissionManager:
+    """Avvolge driver.submit_job(): classifica i fallimenti, ritenta quelli transitori
+    e tiene le statistiche di ammissione (rejection rate, retry, throughput effettivo).
+
+    submit() si può chiamare da più thread: le chiamate al driver sono serializzate
+    (last_error è stato dell'istanza), i backoff no."""
+
+    def __init__(self, driver, policy=None):
+        self.driver = driver
+        self.policy = policy or RetryPolicy()
+        self.accepted = []
+        self.rejected = {}  # job_id -> categoria dell'ultimo errore
+        self.retries = {}  # job_id -> numero di retry
+        self.errors_by_category = collections.Counter()
+        self.backoff_time = 0.0
+        self.schedule_lags = []  # ritardo del primo tentativo rispetto all'orario previsto (perf_counter)
+        self.first_attempts = []  # perf_counter del primo tentativo di ogni job
+        self._first_submit = None
+        self._last_submit = None
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, scheduled=None, **kwargs):
+        """`scheduled` (perf_counter) è l'orario di arrivo previsto in open loop: se presente
+        si registra di quanto il primo tentativo è partito in ritardo"""
+        attempt = 0
+        # I retry sono tentativi dello stesso job: nelle metriche il job conta una volta sola
+        with METRICS.job_scope():
+            while True:
+                with self._lock:
+                    if attempt == 0:
+                        now = time.perf_counter()
+                        self.first_attempts.append(now)
+                        if scheduled is not None:
+                            self.schedule_lags.append(now - scheduled)
+                        if self._first_submit is None:
+                            self._first_submit = time.time()
+                    ok = self.driver.submit_job(job_id=job_id, **kwargs)
+                    if ok:
+                        self.accepted.append(job_id)
+                        break
+                    category = getattr(self.driver, "last_error", None) or UNKNOWN
+                    self.errors_by_category[category] += 1
+
+                if category not in self.policy.retry_on or attempt >= self.policy.max_retries:
+                    self.rejected[job_id] = category
+                    break
+
+                delay = self.policy.delay(attempt)
+                with self._lock:
+                    self.backoff_time += delay
+                METRICS.submit_retries.inc(category)
+                PROFILER.sleep(delay, name="backoff")
+                attempt += 1
+        METRICS.observe_job(ok)
+
+        if attempt:
+            self.retries[job_id] = attempt
+        with self._lock:
+            self._last_submit = max(self._last_submit or 0.0, time.time())
+        return ok
+
+    def stats(self):
+        total = len(self.accepted) + len(self.rejected)
+        elapsed = 0.0
+        if self._first_submit is not None:
+            elapsed = self._last_submit - self._first_submit
+        return {
+            "policy": self.policy.as_dict(),
+            "submitted": total,
+            "accepted": len(self.accepted),
+            "rejected": len(self.rejected),
+            "rejection_rate": round(len(self.rejected) / total, 4) if total else 0.0,
+            "rejected_by_category": dict(collections.Counter(self.rejected.values())),
+            "errors_by_category": dict(self.errors_by_category),
+            "jobs_retried": len(self.retries),
+            "total_retries": sum(self.retries.values()),
+            "max_retries_single_job": max(self.retries.values(), default=0),
+            "backoff_seconds": round(self.backoff_time, 4),
+            "submit_phase_seconds": round(elapsed, 4),
+            "effective_admission_rate": round(len(self.accepted) / elapsed, 4) if elapsed > 0 else None
+        }
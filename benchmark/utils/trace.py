@@ -0,0 +1,193 @@
+import os
+import csv
+import json
+import time
+import threading
+from array import array
+
+import numpy as np
+
+from utils.profiler import PROFILER
+from utils.results import ResultAggregator, list_results
+
+# Sotto questa soglia si passa da time.sleep() al busy-wait per rispettare l'istante di submit
+SPIN_THRESHOLD = 0.002
+
+
+def _parse_constraints(value):
+    """Accetta un dict, una stringa JSON o il formato compatto "type=gpu;zone=a" """
+    if not value:
+        return None
+    if isinstance(value, dict):
+        return value
+    value = value.strip()
+    if value.startswith("{"):
+        return json.loads(value)
+    return dict(pair.split("=", 1) for pair in value.split(";") if pair)
+
+
+def _normalize(row, seq):
+    cpu = row.get("cpu_reservation")
+    return {
+        "seq": seq,
+        "arrival_offset": float(row["arrival_offset"]),
+        "duration": float(row.get("duration") or 5),
+        "job_type": row.get("job_type") or "sleep",
+        "cpu_reservation": str(cpu) if cpu not in (None, "") else None,
+        "constraints": _parse_constraints(row.get("constraints"))
+    }
+
+
+def iter_trace(path):
+    """Legge un trace CSV o JSONL una riga alla volta (nessun caricamento in memoria).
+
+    Colonne: arrival_offset (s dall'inizio), duration, job_type, cpu_reservation, constraints
+    Le righe devono essere ordinate per arrival_offset.
+    """
+    with open(path, "r", newline="") as f:
+        if path.endswith(".jsonl") or path.endswith(".ndjson"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for seq, row in enumerate(rows):
+            yield _normalize(row, seq)
+
+
+class TraceReplayer:
+    """Riproduce un trace su un driver con fattore di accelerazione `speedup`.
+
+    Con `scale_durations` (default) anche le durate sono divise per `speedup`: il replay è una
+    copia compressa nel tempo del trace, con lo stesso carico relativo. Senza, gli arrivi sono
+    `speedup` volte più fitti ma i job durano quanto nel trace (carico offerto x `speedup`).
+
+    Per ogni job salva (in array compatti, 8 byte per valore) l'istante di submit pianificato,
+    quello reale e la durata della chiamata al driver; il job_id è derivato dalla posizione nel trace ({prefix}{seq}), così non
+    serve tenere in memoria nessuna stringa per job. Un thread separato campiona il backlog.
+    I worker scrivono nel layout sharded di `run_id` (vedi utils/results.py).
+    """
+
+    def __init__(self, driver, trace_path, results_dir, run_id, speedup=1.0, limit=None, backlog_interval=5.0,
+                 scale_durations=True):
+        self.driver = driver
+        self.trace_path = trace_path
+        self.results_dir = results_dir
+        self.run_id = run_id
+        self.speedup = float(speedup)
+        self.scale_durations = scale_durations
+        self.limit = limit
+        self.backlog_interval = backlog_interval
+        self.scheduled_ts = array("d")
+        self.submit_ts = array("d")
+        self.call_latency = array("d")
+        self.failed = 0
+        self.out_of_order = 0
+        self.backlog = []
+        self._submitted = 0
+        self._stop = threading.Event()
+        self.t0_wall = None
+
+    def _wait_until(self, target):
+        delay = target - time.perf_counter()
+        if delay > SPIN_THRESHOLD:
+            PROFILER.sleep(delay - SPIN_THRESHOLD, name="pacing")
+        while time.perf_counter() < target:
+            pass
+
+    def _count_completed(self, prefix):
+        return len(list_results(self.results_dir, self.run_id, prefix))
+
+    def _sample_backlog(self, t0, prefix):
+        while not self._stop.wait(self.backlog_interval):
+            try:
+                completed = self._count_completed(prefix)
+            except OSError:
+                continue
+            self.backlog.append({
+                "t": round(time.time() - t0, 2),
+                "submitted": self._submitted,
+                "completed": completed,
+                "backlog": self._submitted - completed
+            })
+
+    def run(self, prefix="replay-"):
+        mode = "durations scaled" if self.scale_durations else "durations unscaled: offered load x speedup"
+        print(f"[TRACE] Replaying at x{self.speedup:g} ({mode})")
+        duration_factor = 1.0 / self.speedup if self.scale_durations else 1.0
+        self.t0_wall = time.time()
+        t0 = time.perf_counter()
+        sampler = threading.Thread(target=self._sample_backlog, args=(self.t0_wall, prefix), daemon=True)
+        sampler.start()
+
+        last_offset = 0.0
+        with PROFILER.span("submit", cat="phase", trace=os.path.basename(self.trace_path)):
+            for job in iter_trace(self.trace_path):
+                if self.limit is not None and job["seq"] >= self.limit:
+                    break
+                if job["arrival_offset"] < last_offset:
+                    self.out_of_order += 1
+                last_offset = max(last_offset, job["arrival_offset"])
+
+                target = t0 + job["arrival_offset"] / self.speedup
+                self._wait_until(target)
+
+                # Offset pianificato/reale rispetto all'inizio del replay (stesso orologio monotono)
+                self.scheduled_ts.append(target - t0)
+                call_start = time.perf_counter()
+                self.submit_ts.append(call_start - t0)
+                job_id = f"{prefix}{job['seq']}"
+                ok = self.driver.submit_job(job_id=job_id, job_type=job["job_type"],
+                                            duration=job["duration"] * duration_factor,
+                                            cpu_reservation=job["cpu_reservation"],
+                                            constraints=job["constraints"], extra_env={"RUN_ID": self.run_id})
+                self.call_latency.append(time.perf_counter() - call_start)
+                # Solo i job accettati entrano nel backlog: i rifiutati non completeranno mai
+                if ok:
+                    self._submitted += 1
+                else:
+                    self.failed += 1
+
+        return self._submitted
+
+    def wait_for_completion(self, timeout, prefix="replay-", poll_interval=2.0):
+        expected = self._submitted
+        deadline = time.time() + timeout
+        completed = 0
+        with PROFILER.span("poll", cat="phase"):
+            while time.time() < deadline:
+                completed = self._count_completed(prefix)
+                print(f"\rStatus: {completed}/{expected} finished...", end="")
+                if completed >= expected:
+                    break
+                PROFILER.sleep(poll_interval)
+        print()
+        self._stop.set()
+        return completed
+
+    def start_latencies(self, prefix="replay-"):
+        """submit reale -> start_ts del worker, dai risultati del run aggregati in parallelo"""
+        with PROFILER.span("collect", cat="phase"):
+            rows = ResultAggregator(self.results_dir, self.run_id).aggregate(prefix=prefix)
+        # Il seq nel job_id ({prefix}{seq}) indicizza direttamente gli istanti di submit
+        seqs = np.array([int(job_id[len(prefix):]) for job_id in rows["job_id"]], dtype=np.int64)
+        submit_offsets = np.frombuffer(self.submit_ts, dtype=np.float64)
+        valid = (seqs < len(submit_offsets)) & ~np.isnan(rows["start_ts"])
+        latencies = np.maximum(rows["start_ts"][valid] - (self.t0_wall + submit_offsets[seqs[valid]]), 0.0)
+        return array("d", latencies.tobytes())
+
+    def submit_lags(self):
+        """Ritardo dell'harness (istante pianificato -> inizio della chiamata), non dell'orchestratore"""
+        return array("d", (actual - scheduled for actual, scheduled in zip(self.submit_ts, self.scheduled_ts)))
+
+    def harness_saturation(self):
+        """Il submit è sincrono: se la chiamata al driver dura più dell'intervallo tra arrivi,
+        il lag cresce senza limite e misura la coda dell'harness, non l'orchestratore"""
+        n = len(self.scheduled_ts)
+        if n < 2:
+            return None
+        interarrival = (self.scheduled_ts[-1] - self.scheduled_ts[0]) / (n - 1)
+        call = sum(self.call_latency) / len(self.call_latency)
+        return {
+            "mean_interarrival_s": round(interarrival, 6),
+            "mean_call_latency_s": round(call, 6),
+            "saturated": call >= interarrival
+        }
@@ -0,0 +1,163 @@
+import collections
+
+import numpy as np
+
+from utils.results import ResultAggregator
+
+
+class UtilizationAnalyzer:
+    """Ricostruisce l'occupazione del cluster dai timestamp dei worker e dalle risorse richieste.
+
+    Per ogni nodo calcola le CPU riservate nel tempo (sweep sugli eventi start/end) rispetto
+    alla capacità scoperta dal driver (`driver.get_nodes()`), e riporta:
+      - utilizzo medio (CPU-secondi riservati / capacità x makespan)
+      - frammentazione: capacità libera mentre c'erano job in coda, separando quella
+        "stranded" (nodi con meno CPU libere della richiesta più piccola in coda) da quella
+        che il job avrebbe potuto usare (latenza dello scheduler)
+      - makespan rispetto a un lower bound di impacchettamento ideale
+    """
+
+    def __init__(self, nodes, step=1.0):
+        self.capacity = {n["name"]: float(n["cpus"]) for n in nodes}
+        self.total_capacity = sum(self.capacity.values())
+        # Passo della timeline salvata nel report (l'analisi è esatta, non campionata)
+        self.step = step
+        self.jobs = []
+        self.unknown_nodes = collections.Counter()
+
+    def add_job(self, job_id, submit_ts, start_ts, end_ts, node, cpus):
+        if node not in self.capacity:
+            # Job su un nodo non scoperto (es. hostname del container): non attribuibile
+            self.unknown_nodes[node] += 1
+            return False
+        self.jobs.append((job_id, submit_ts, max(start_ts, submit_ts), end_ts, node, float(cpus)))
+        return True
+
+    def load_results(self, results_dir, run_id, prefix, submission_times, cpus_by_job):
+        """Legge i risultati sharded del run (ResultAggregator); `cpus_by_job` è la
+        reservation usata al submit"""
+        rows = ResultAggregator(results_dir, run_id).aggregate(prefix=prefix)
+        rows = rows[~np.isnan(rows["start_ts"]) & ~np.isnan(rows["end_ts"])]
+        loaded = 0
+        for job_id, node, start_ts, end_ts in zip(rows["job_id"].tolist(), rows["node"].tolist(),
+                                                  rows["start_ts"].tolist(), rows["end_ts"].tolist()):
+            job_id = job_id.decode()
+            if job_id not in cpus_by_job:
+                continue
+            submit_ts = submission_times.get(job_id, start_ts)
+            if self.add_job(job_id, submit_ts, start_ts, end_ts, node.decode(), cpus_by_job[job_id]):
+                loaded += 1
+        if self.unknown_nodes:
+            print(f"[UTILIZATION] Jobs on undiscovered nodes ignored: {dict(self.unknown_nodes)}")
+        return loaded
+
+    def ideal_makespan(self):
+        """Lower bound del makespan con impacchettamento perfetto (CPU frazionabili):
+        nessun job finisce prima di submit + durata, e il lavoro sottomesso dopo l'istante s
+        non può finire prima di s + lavoro / capacità totale."""
+        if not self.jobs or self.total_capacity <= 0:
+            return None
+        t0 = min(j[1] for j in self.jobs)
+        by_submit = sorted(self.jobs, key=lambda j: j[1])
+        bound = max(j[1] - t0 + (j[3] - j[2]) for j in self.jobs)
+        remaining_work = sum((j[3] - j[2]) * j[5] for j in self.jobs)
+        for job in by_submit:
+            bound = max(bound, job[1] - t0 + remaining_work / self.total_capacity)
+            remaining_work -= (job[3] - job[2]) * job[5]
+        return bound
+
+    def analyze(self):
+        if not self.jobs:
+            return None
+
+        # Eventi: (t, ordine, tipo, nodo, cpus). A parità di tempo prima i rilasci e le uscite
+        # dalla coda, poi le allocazioni e gli ingressi in coda.
+        events = []
+        for job_id, submit_ts, start_ts, end_ts, node, cpus in self.jobs:
+            events.append((submit_ts, 1, "enqueue", None, cpus))
+            events.append((start_ts, 0, "dequeue", None, cpus))
+            events.append((start_ts, 1, "alloc", node, cpus))
+            events.append((end_ts, 0, "release", node, cpus))
+        events.sort(key=lambda e: (e[0], e[1]))
+
+        t0 = events[0][0]
+        used = {node: 0.0 for node in self.capacity}
+        queued = collections.Counter()  # richiesta CPU -> job in coda
+        reserved_cpu_s = {node: 0.0 for node in self.capacity}
+        peak = {node: 0.0 for node in self.capacity}
+        queued_seconds = 0.0
+        idle_while_queued = 0.0
+        stranded = 0.0
+        timeline = []
+        next_sample = t0
+        prev_t = t0
+
+        for t, _, kind, node, cpus in events:
+            dt = t - prev_t
+            if dt > 0:
+                # Lo stato è costante in [prev_t, t)
+                while next_sample < t:
+                    timeline.append({
+                        "t": round(next_sample - t0, 3),
+                        "reserved": {n: round(u, 3) for n, u in used.items()},
+                        "queued": sum(k for k in queued.values() if k > 0)
+                    })
+                    next_sample += self.step
+                for n, u in used.items():
+                    reserved_cpu_s[n] += u * dt
+                waiting = [c for c, k in queued.items() if k > 0]
+                if waiting:
+                    smallest = min(waiting)
+                    queued_seconds += dt
+                    for n, u in used.items():
+                        free = max(self.capacity[n] - u, 0.0)
+                        idle_while_queued += free * dt
+                        if free < smallest:
+                            stranded += free * dt
+                prev_t = t
+
+            if kind == "enqueue":
+                queued[cpus] += 1
+            elif kind == "dequeue":
+                queued[cpus] -= 1
+            elif kind == "alloc":
+                used[node] += cpus
+                peak[node] = max(peak[node], used[node])
+            else:
+                used[node] -= cpus
+
+        makespan = prev_t - t0
+        ideal = self.ideal_makespan()
+        queued_capacity_s = self.total_capacity * queued_seconds
+
+        return {
+            "capacity_cpus": self.total_capacity,
+            "jobs": len(self.jobs),
+            "makespan_seconds": round(makespan, 4),
+            "ideal_makespan_seconds": round(ideal, 4),
+            # 1.0 = impacchettamento ideale
+            "makespan_ratio": round(makespan / ideal, 4) if ideal else None,
+            "avg_utilization": round(sum(reserved_cpu_s.values()) / (self.total_capacity * makespan), 4)
+            if makespan > 0 else None,
+            "fragmentation": {
+                "queued_seconds": round(queued_seconds, 4),
+                "idle_while_queued_cpu_s": round(idle_while_queued, 4),
+                "stranded_cpu_s": round(stranded, 4),
+                "schedulable_idle_cpu_s": round(idle_while_queued - stranded, 4),
+                "fragmentation_ratio": round(stranded / queued_capacity_s, 4) if queued_capacity_s > 0 else 0.0
+            },
+            "nodes": {
+                n: {
+                    "capacity_cpus": self.capacity[n],
+                    "reserved_cpu_seconds": round(reserved_cpu_s[n], 4),
+                    "utilization": round(reserved_cpu_s[n] / (self.capacity[n] * makespan), 4)
+                    if makespan > 0 and self.capacity[n] > 0 else None,
+                    "peak_reserved_cpus": peak[n],
+                    # Reservation oltre la capacità: l'orchestratore non la sta facendo rispettare
+                    "overcommitted": peak[n] > self.capacity[n] + 1e-9
+                }
+                for n in self.capacity
+            },
+            "unknown_node_jobs": dict(self.unknown_nodes),
+            "timeline": timeline
+        }
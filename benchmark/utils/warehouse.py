@@ -0,0 +1,385 @@
+import os
+import sys
+import glob
+import json
+import math
+import time
+import secrets
+import itertools
+import sqlite3
+import argparse
+import collections
+
+# Database locale condiviso da tutti i run (non sta sull'NFS, non viene mai cancellato dai test)
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "results", "warehouse.sqlite")
+
+# Metriche per-job per cui si precalcolano i percentili all'ingestione
+JOB_METRICS = ("start_latency", "duration_real", "turnaround")
+PERCENTILES = (50, 90, 95, 99)
+# Istogramma per run a bucket logaritmici (errore relativo <= HIST_ALPHA): si somma tra run,
+# quindi i percentili "pooled" su più run non rileggono mai la tabella jobs
+HIST_ALPHA = 0.01
+HIST_GAMMA = (1 + HIST_ALPHA) / (1 - HIST_ALPHA)
+# Valori sotto questa soglia (latenze nulle) finiscono tutti nel bucket ZERO_BUCKET
+HIST_MIN_VALUE = 1e-6
+ZERO_BUCKET = -(2 ** 31)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id       TEXT PRIMARY KEY,
+    orchestrator TEXT NOT NULL,
+    scenario     TEXT NOT NULL,
+    created_at   REAL NOT NULL,
+    num_jobs     INTEGER NOT NULL DEFAULT 0,
+    summary      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_orch_scen ON runs (orchestrator, scenario, created_at);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id          TEXT NOT NULL,
+    job_id          TEXT NOT NULL,
+    node            TEXT,
+    status          TEXT,
+    job_type        TEXT,
+    submit_ts       REAL,
+    start_ts        REAL,
+    end_ts          REAL,
+    duration_target REAL,
+    duration_real   REAL,
+    start_latency   REAL,
+    turnaround      REAL,
+    PRIMARY KEY (run_id, job_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_jobs_job_id ON jobs (job_id);
+
+CREATE TABLE IF NOT EXISTS job_events (
+    run_id TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    event  TEXT NOT NULL,
+    ts     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_run_job ON job_events (run_id, job_id, ts);
+
+CREATE TABLE IF NOT EXISTS run_stats (
+    run_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    count  INTEGER NOT NULL,
+    mean   REAL,
+    min    REAL,
+    max    REAL,
+    p50    REAL,
+    p90    REAL,
+    p95    REAL,
+    p99    REAL,
+    PRIMARY KEY (run_id, metric)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS run_hist (
+    run_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count  INTEGER NOT NULL,
+    PRIMARY KEY (run_id, metric, bucket)
+) WITHOUT ROWID;
+"""
+
+
+def new_run_id(orchestrator, scenario):
+    # Suffisso casuale: due run avviati nello stesso secondo non devono collidere
+    return f"{orchestrator}-{scenario}-{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def _percentile(sorted_values, q):
+    """Percentile con interpolazione lineare (stessa definizione di numpy.percentile)"""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def _hist_bucket(value):
+    if value < HIST_MIN_VALUE:
+        return ZERO_BUCKET
+    return math.ceil(math.log(value, HIST_GAMMA))
+
+
+def _hist_value(bucket):
+    """Valore rappresentativo del bucket (a metà in scala relativa)"""
+    if bucket == ZERO_BUCKET:
+        return 0.0
+    return 2 * HIST_GAMMA ** bucket / (HIST_GAMMA + 1)
+
+
+def _hist_percentile(buckets, q):
+    """Percentile da [(bucket, count)] ordinati per bucket"""
+    total = sum(count for _, count in buckets)
+    if not total:
+        return None
+    rank = (total - 1) * q / 100.0
+    seen = 0
+    for bucket, count in buckets:
+        seen += count
+        if seen > rank:
+            return _hist_value(bucket)
+    return _hist_value(buckets[-1][0])
+
+
+class ResultsWarehouse:
+    """Archivio SQLite dei risultati per-job, delle timeline e dei riassunti di ogni run.
+
+    Le query aggregate lavorano sulla tabella `run_stats` (percentili precalcolati per run
+    all'ingestione), quindi restano nell'ordine dei millisecondi anche con milioni di job.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- Ingestione ---
+    def ingest_run(self, run_id, orchestrator, scenario, records, submission_times=None, summary=None):
+        """Carica un run: `records` sono i dict scritti dal worker ({job_id}.json)"""
+        submission_times = submission_times or {}
+        rows = []
+        events = []
+        for data in records:
+            job_id = data.get("job_id", "unknown")
+            start_ts = data.get("start_ts")
+            end_ts = data.get("end_ts")
+            submit_ts = submission_times.get(job_id)
+            start_latency = None
+            turnaround = None
+            if submit_ts is not None and start_ts is not None:
+                start_latency = max(start_ts - submit_ts, 0.0)
+            if submit_ts is not None and end_ts is not None:
+                turnaround = max(end_ts - submit_ts, 0.0)
+            rows.append((run_id, job_id, data.get("node"), data.get("status"), data.get("job_type"),
+                         submit_ts, start_ts, end_ts, data.get("duration_target"), data.get("duration_real"),
+                         start_latency, turnaround))
+            for event, ts in (("submitted", submit_ts), ("started", start_ts), ("finished", end_ts)):
+                if ts is not None:
+                    events.append((run_id, job_id, event, ts))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM jobs WHERE run_id = ?", (run_id,))
+            self.conn.execute("DELETE FROM job_events WHERE run_id = ?", (run_id,))
+            self.conn.execute("DELETE FROM run_stats WHERE run_id = ?", (run_id,))
+            self.conn.execute("DELETE FROM run_hist WHERE run_id = ?", (run_id,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, orchestrator, scenario, created_at, num_jobs, summary) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, orchestrator, scenario, time.time(), len(rows),
+                 json.dumps(summary) if summary is not None else None))
+            self.conn.executemany("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("INSERT INTO job_events VALUES (?, ?, ?, ?)", events)
+            self._compute_run_stats(run_id)
+
+        print(f"[WAREHOUSE] Ingested run {run_id}: {len(rows)} jobs -> {self.db_path}")
+        return len(rows)
+
+    def ingest_results_dir(self, run_id, orchestrator, scenario, results_dir, pattern="*.json",
+                           submission_times=None, summary=None):
+        records = []
+        for path in glob.glob(os.path.join(results_dir, pattern)):
+            try:
+                with open(path, "r") as f:
+                    records.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return self.ingest_run(run_id, orchestrator, scenario, records, submission_times, summary)
+
+    def ingest_array(self, run_id, orchestrator, scenario, rows, submission_times=None, summary=None):
+        """Carica un run dall'array aggregato di utils/results.py, senza rileggere i file"""
+        records = []
+        for job_id, node, start_ts, end_ts, duration_real, status in rows.tolist():
+            records.append({
+                "job_id": job_id.decode(),
+                "node": node.decode(),
+                "status": status.decode(),
+                # NaN = campo assente nel file risultato
+                "start_ts": None if math.isnan(start_ts) else start_ts,
+                "end_ts": None if math.isnan(end_ts) else end_ts,
+                "duration_real": None if math.isnan(duration_real) else duration_real
+            })
+        return self.ingest_run(run_id, orchestrator, scenario, records, submission_times, summary)
+
+    def _compute_run_stats(self, run_id):
+        for metric in JOB_METRICS:
+            values = [r[0] for r in self.conn.execute(
+                f"SELECT {metric} FROM jobs WHERE run_id = ? AND {metric} IS NOT NULL ORDER BY {metric}",
+                (run_id,))]
+            if not values:
+                continue
+            self.conn.execute(
+                "INSERT OR REPLACE INTO run_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, metric, len(values), sum(values) / len(values), values[0], values[-1],
+                 *[_percentile(values, q) for q in PERCENTILES]))
+            hist = collections.Counter(_hist_bucket(v) for v in values)
+            self.conn.executemany("INSERT INTO run_hist VALUES (?, ?, ?, ?)",
+                                  [(run_id, metric, bucket, count) for bucket, count in hist.items()])
+
+    # --- Query ---
+    def runs(self, orchestrator=None, scenario=None, last=None):
+        sql = "SELECT run_id, orchestrator, scenario, created_at, num_jobs FROM runs WHERE 1=1"
+        params = []
+        if orchestrator:
+            sql += " AND orchestrator = ?"
+            params.append(orchestrator)
+        if scenario:
+            sql += " AND scenario = ?"
+            params.append(scenario)
+        sql += " ORDER BY created_at DESC"
+        if last:
+            sql += " LIMIT ?"
+            params.append(int(last))
+        return self.conn.execute(sql, params).fetchall()
+
+    def aggregate(self, metric="start_latency", stat="p99", scenario=None, last=20, pooled=False):
+        """Ritorna {orchestrator: {runs, jobs, per_run_mean, per_run_min, per_run_max, pooled}}
+        sugli ultimi `last` run di ogni orchestratore.
+
+        `per_run_*` aggregano la statistica `stat` precalcolata per run (la media dei p99 non è
+        un p99). Con pooled=True, `pooled` è `stat` su tutti i job di quei run: mean/min/max
+        esatti da run_stats, i percentili dalla somma degli istogrammi per run (run_hist,
+        errore relativo <= HIST_ALPHA). Nessuna delle due strade legge la tabella jobs."""
+        if metric not in JOB_METRICS:
+            raise ValueError(f"Unknown metric {metric!r} (choose from {', '.join(JOB_METRICS)})")
+        allowed = ("mean", "min", "max") + tuple(f"p{q}" for q in PERCENTILES)
+        if stat not in allowed:
+            raise ValueError(f"Unknown stat {stat!r} (choose from {', '.join(allowed)})")
+
+        ranked = """
+            WITH ranked AS (
+                SELECT run_id, orchestrator,
+                       ROW_NUMBER() OVER (PARTITION BY orchestrator ORDER BY created_at DESC) AS rn
+                FROM runs
+                WHERE (? IS NULL OR scenario = ?)
+            )
+        """
+        sql = ranked + f"""
+            SELECT r.orchestrator, COUNT(*), SUM(s.count), AVG(s.{stat}), MIN(s.{stat}), MAX(s.{stat}),
+                   SUM(s.count * s.mean) / SUM(s.count), MIN(s.min), MAX(s.max)
+            FROM ranked r JOIN run_stats s ON s.run_id = r.run_id AND s.metric = ?
+            WHERE r.rn <= ?
+            GROUP BY r.orchestrator
+            ORDER BY r.orchestrator
+        """
+        result = {}
+        for orch, n_runs, n_jobs, avg, lo, hi, p_mean, p_min, p_max in self.conn.execute(
+                sql, (scenario, scenario, metric, int(last))):
+            result[orch] = {"runs": n_runs, "jobs": n_jobs, "per_run_mean": avg, "per_run_min": lo,
+                            "per_run_max": hi, "pooled": None}
+            if pooled and stat in ("mean", "min", "max"):
+                result[orch]["pooled"] = {"mean": p_mean, "min": p_min, "max": p_max}[stat]
+        if not pooled or stat in ("mean", "min", "max"):
+            return result
+
+        # Qualche centinaio di bucket per run invece di una riga per job
+        sql = ranked + """
+            SELECT r.orchestrator, h.bucket, SUM(h.count)
+            FROM ranked r JOIN run_hist h ON h.run_id = r.run_id AND h.metric = ?
+            WHERE r.rn <= ?
+            GROUP BY r.orchestrator, h.bucket
+            ORDER BY r.orchestrator, h.bucket
+        """
+        rows = self.conn.execute(sql, (scenario, scenario, metric, int(last)))
+        for orch, group in itertools.groupby(rows, key=lambda row: row[0]):
+            if orch in result:
+                result[orch]["pooled"] = _hist_percentile([(b, c) for _, b, c in group], int(stat[1:]))
+        return result
+
+    def job(self, job_id, run_id=None):
+        sql = "SELECT * FROM jobs WHERE job_id = ?"
+        params = [job_id]
+        if run_id:
+            sql += " AND run_id = ?"
+            params.append(run_id)
+        cur = self.conn.execute(sql, params)
+        cols = [c[0] for c in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def timeline(self, run_id, job_id=None):
+        sql = "SELECT job_id, event, ts FROM job_events WHERE run_id = ?"
+        params = [run_id]
+        if job_id:
+            sql += " AND job_id = ?"
+            params.append(job_id)
+        sql += " ORDER BY job_id, ts"
+        return self.conn.execute(sql, params).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="COB-Job results warehouse")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ingest = sub.add_parser("ingest", help="Load a results directory and an optional summary JSON")
+    p_ingest.add_argument("--orchestrator", required=True)
+    p_ingest.add_argument("--scenario", required=True)
+    p_ingest.add_argument("--results-dir", required=True)
+    p_ingest.add_argument("--pattern", default="*.json")
+    p_ingest.add_argument("--summary")
+    p_ingest.add_argument("--run-id")
+
+    p_runs = sub.add_parser("runs", help="List ingested runs")
+    p_runs.add_argument("--orchestrator")
+    p_runs.add_argument("--scenario")
+    p_runs.add_argument("--last", type=int, default=20)
+
+    p_agg = sub.add_parser("aggregate", help="Per-orchestrator aggregate over the last N runs")
+    p_agg.add_argument("--metric", default="start_latency", choices=JOB_METRICS)
+    p_agg.add_argument("--stat", default="p99")
+    p_agg.add_argument("--scenario")
+    p_agg.add_argument("--last", type=int, default=20)
+    p_agg.add_argument("--pooled", action="store_true",
+                       help="Also compute the statistic pooled over all jobs (merged per-run histograms)")
+
+    p_job = sub.add_parser("job", help="Show a job across runs")
+    p_job.add_argument("job_id")
+    p_job.add_argument("--run-id")
+
+    args = parser.parse_args(argv)
+    wh = ResultsWarehouse(args.db)
+
+    if args.command == "ingest":
+        summary = None
+        if args.summary:
+            with open(args.summary, "r") as f:
+                summary = json.load(f)
+        run_id = args.run_id or new_run_id(args.orchestrator, args.scenario)
+        wh.ingest_results_dir(run_id, args.orchestrator, args.scenario, args.results_dir,
+                              pattern=args.pattern, summary=summary)
+    elif args.command == "runs":
+        for run_id, orch, scen, created_at, num_jobs in wh.runs(args.orchestrator, args.scenario, args.last):
+            print(f"{run_id:<50} {orch:<8} {scen:<24} {time.strftime('%Y-%m-%d %H:%M', time.localtime(created_at))} "
+                  f"{num_jobs} jobs")
+    elif args.command == "aggregate":
+        start = time.perf_counter()
+        result = wh.aggregate(args.metric, args.stat, args.scenario, args.last, pooled=args.pooled)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{args.stat}({args.metric}) over last {args.last} runs per orchestrator:")
+        for orch, row in result.items():
+            pooled = f"pooled {args.stat}={row['pooled']:.4f}s, " if row["pooled"] is not None else ""
+            print(f"  {orch:<8} {pooled}per-run {args.stat}: mean={row['per_run_mean']:.4f}s "
+                  f"min={row['per_run_min']:.4f}s max={row['per_run_max']:.4f}s "
+                  f"({row['runs']} runs, {row['jobs']} jobs)")
+        print(f"[query took {elapsed_ms:.2f} ms]")
+    elif args.command == "job":
+        for row in wh.job(args.job_id, args.run_id):
+            print(json.dumps(row))
+
+    wh.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,180 @@
 import os
+import sys
 import time
 import json
+import signal
 import socket
+import hashlib
+import threading
+import subprocess
+import multiprocessing
+
+# I thread BLAS vanno fissati prima di importare numpy, ma solo per i job 'parallel' o se
+# THREADS è esplicito: i workload 'cpu'/'io' restano come nella baseline. Valori già presenti
+# nell'ambiente non vengono sovrascritti.
+if os.environ.get("JOB_TYPE") == "parallel" or "THREADS" in os.environ:
+    for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(_var, os.environ.get("THREADS", "1"))
+
 import numpy as np
 from datetime import datetime
 
 # --- CONFIGURAZIONE DA ENV VARS ---
 JOB_ID = os.environ.get("JOB_ID", "unknown")
-JOB_TYPE = os.environ.get("JOB_TYPE", "cpu")  # 'cpu', 'io', 'sleep'
+JOB_TYPE = os.environ.get("JOB_TYPE", "cpu")  # 'cpu', 'io', 'sleep', 'noop', 'parallel'
 DURATION = float(os.environ.get("DURATION", "10"))
+# Job 'parallel': quantità di lavoro fissa (prodotti matriciali) divisa su PROCS processi
+# oppure affidata a THREADS thread BLAS
+THREADS = int(os.environ.get("THREADS", "1"))
+PROCS = int(os.environ.get("PROCS", "1"))
+WORK_UNITS = int(os.environ.get("WORK_UNITS", "200"))
+PARALLEL_MATRIX_SIZE = int(os.environ.get("MATRIX_SIZE", "500"))
+# Tempo di un'unità su un core misurato dall'harness su un nodo libero prima del burst
+# (test/parallelism.py); se manca il job si calibra da solo, anche sotto contesa
+UNIT_TIME_1CORE = float(os.environ["UNIT_TIME_1CORE"]) if os.environ.get("UNIT_TIME_1CORE") else None
 OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "/mnt/results")
+# Se impostato, risultati sharded: {OUTPUT_DIR}/{RUN_ID}/{md5(JOB_ID)[:2]}/ (vedi benchmark/utils/results.py)
+RUN_ID = os.environ.get("RUN_ID")
+# Nome del nodo dell'orchestratore (iniettato dai driver); nel container l'hostname è spesso l'ID
+NODE_NAME = os.environ.get("NODE_NAME") or socket.gethostname()
+# Traduzione delle risorse usata dal driver ("chiave=valore,..."), riportata nel risultato
+RESOURCES = dict(item.split("=", 1) for item in os.environ.get("RESOURCES", "").split(",") if "=" in item)
+# Heartbeat opzionali verso l'harness via UDP ("host:port"); se assente non parte nessun thread
+HEARTBEAT_ADDR = os.environ.get("HEARTBEAT_ADDR")
+HEARTBEAT_INTERVAL = max(float(os.environ.get("HEARTBEAT_INTERVAL", "1.0")), 0.1)
 # Simulazione vincolo hardware (solo descrittivo per il log)
 REQUIRES_GPU = os.environ.get("REQUIRES_GPU", "false").lower() == "true"
+# Gang job: numero di membri e indice del membro (Swarm slot / K8s Indexed Job / Nomad alloc index)
+GANG_SIZE = int(os.environ.get("GANG_SIZE", "1"))
+GANG_MEMBER = os.environ.get("GANG_MEMBER",
+                             os.environ.get("JOB_COMPLETION_INDEX", os.environ.get("NOMAD_ALLOC_INDEX", "0")))
+# Con più membri ogni task scrive il proprio file: {JOB_ID}-m{GANG_MEMBER}
+RESULT_NAME = f"{JOB_ID}-m{GANG_MEMBER}" if GANG_SIZE > 1 else JOB_ID
+# Rendezvous del gang: ogni membro tiene la sua reservation e aspetta gli altri fino a questo timeout
+GANG_BARRIER_TIMEOUT = float(os.environ.get("GANG_BARRIER_TIMEOUT", "600"))
+GANG_BARRIER_POLL = 0.5
+
+
+# Iterazioni di lavoro completate (matrici, scritture, unità): letto dal thread degli heartbeat
+PROGRESS = 0
+
+
+class Terminated(Exception):
+    """SIGTERM ricevuto dall'orchestratore (preemption, stop, eviction)"""
+
+
+class GangBarrierTimeout(Exception):
+    """Il gang non si è completato entro GANG_BARRIER_TIMEOUT"""
+
+
+def _on_sigterm(signum, frame):
+    raise Terminated()
+
+
+def get_output_dir():
+    # Assicuriamoci che la directory esista (se il volume è montato correttamente)
+    if not os.path.exists(OUTPUT_DIR):
+        print(f"[WORKER] Warning: Output dir {OUTPUT_DIR} does not exist. Using /tmp")
+        return "/tmp"
+    if RUN_ID:
+        # Stesso shard per tutti i membri di un gang (hash del JOB_ID, non di RESULT_NAME)
+        shard_dir = os.path.join(OUTPUT_DIR, RUN_ID, hashlib.md5(JOB_ID.encode()).hexdigest()[:2])
+        os.makedirs(shard_dir, exist_ok=True)
+        return shard_dir
+    return OUTPUT_DIR
+
+
+def wait_for_gang():
+    """Barriera: attende i marker .started di tutti i GANG_SIZE membri (stesso JOB_ID) e
+    ritorna i secondi di attesa. Un gang piazzato a metà resta fermo qui, con le risorse
+    prenotate, come un vero job MPI: è questo che rende osservabile il deadlock."""
+    out_dir = get_output_dir()
+    prefix = f"{JOB_ID}-m"
+    start = time.time()
+    while True:
+        started = sum(1 for name in os.listdir(out_dir) if name.startswith(prefix) and name.endswith(".started"))
+        if started >= GANG_SIZE:
+            return time.time() - start
+        if time.time() - start > GANG_BARRIER_TIMEOUT:
+            raise GangBarrierTimeout(f"{started}/{GANG_SIZE} members started after {GANG_BARRIER_TIMEOUT:g}s")
+        time.sleep(GANG_BARRIER_POLL)
+
+
+def write_killed_record(start_ts):
+    """Registra un tentativo interrotto: serve a contare le preemption e il lavoro sprecato.
+    L'estensione .killed non interferisce con i glob *.json usati dai test."""
+    kill_ts = time.time()
+    record = {
+        "job_id": JOB_ID,
+        "node": NODE_NAME,
+        "status": "killed",
+        "job_type": JOB_TYPE,
+        "start_ts": start_ts,
+        "kill_ts": kill_ts,
+        "gang_member": GANG_MEMBER,
+        "work_lost": kill_ts - start_ts
+    }
+    output_file = os.path.join(get_output_dir(), f"{RESULT_NAME}.{int(start_ts * 1000)}.killed")
+    try:
+        with open(output_file, "w") as f:
+            json.dump(record, f)
+        print(f"[WORKER] Terminated after {record['work_lost']:.2f}s, record written to {output_file}")
+    except Exception as e:
+        print(f"[WORKER] Could not write killed record: {e}")
+
+
+def _heartbeat_loop(stop):
+    """Un datagramma ogni HEARTBEAT_INTERVAL: overhead fisso e indipendente dal lavoro.
+    UDP best effort: niente connessione, niente attese se l'harness non ascolta."""
+    host, port = HEARTBEAT_ADDR.rsplit(":", 1)
+    try:
+        addr = (socket.gethostbyname(host), int(port))
+    except OSError as e:
+        print(f"[WORKER] Heartbeats disabled, cannot resolve {host}: {e}")
+        return
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    seq = 0
+    while True:
+        done = stop.wait(HEARTBEAT_INTERVAL)
+        payload = {
+            "j": RESULT_NAME,
+            "n": NODE_NAME,
+            "y": JOB_TYPE,
+            "s": seq,
+            "i": PROGRESS,
+            # CPU time del processo (tutti i thread; i figli del pool 'parallel' non sono inclusi)
+            "c": time.process_time(),
+            "t": time.monotonic(),
+            "f": done
+        }
+        try:
+            sock.sendto(json.dumps(payload, separators=(",", ":")).encode(), addr)
+        except OSError:
+            pass
+        seq += 1
+        if done:
+            break
+    sock.close()
+
+
+def start_heartbeats():
+    if not HEARTBEAT_ADDR:
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(target=_heartbeat_loop, args=(stop,), daemon=True)
+    thread.start()
+    return stop, thread
+
+
+def stop_heartbeats(heartbeats):
+    if heartbeats:
+        stop, thread = heartbeats
+        stop.set()
+        thread.join(timeout=1.0)
+
 
 def do_cpu_work(duration_sec):
+    global PROGRESS
     start = time.time()
     #matrice 500x500
     matrix_size = 500
@@ -21,26 +182,133 @@ def do_cpu_work(duration_sec):
         a = np.random.rand(matrix_size, matrix_size)
         b = np.random.rand(matrix_size, matrix_size)
         _ = np.dot(a, b)
+        PROGRESS += 1
         # Breve sleep per evitare di bloccare completamente il GIL o il container se necessario
         time.sleep(0.01)
 
 def do_io_work(duration_sec):
+    global PROGRESS
     start = time.time()
     while time.time() < start + duration_sec:
         with open("/tmp/io_test.dat", "w") as f:
             f.write("data" * 1000)
+        PROGRESS += 1
         time.sleep(0.1)
 
+def _matmul_units(units, matrix_size=PARALLEL_MATRIX_SIZE):
+    # Nessuno sleep: il lavoro è CPU-bound puro, così l'efficienza riflette i core davvero ottenuti
+    global PROGRESS
+    rng = np.random.default_rng()
+    a = rng.random((matrix_size, matrix_size))
+    b = rng.random((matrix_size, matrix_size))
+    for _ in range(units):
+        a = np.dot(a, b)
+        a /= np.abs(a).max()
+        # Nei processi del pool incrementa la copia locale: il padre conta i chunk completati
+        PROGRESS += 1
+    return units
+
+
+def _pool_init():
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def calibrate_unit_time(units=5):
+    """Tempo di un'unità di lavoro su un solo core (processo separato con BLAS a 1 thread)"""
+    code = ("import time, numpy as np\n"
+            f"n = {PARALLEL_MATRIX_SIZE}\n"
+            "a = np.random.rand(n, n); b = np.random.rand(n, n); np.dot(a, b)\n"
+            "t = time.perf_counter()\n"
+            f"for _ in range({units}):\n"
+            "    a = np.dot(a, b); a /= np.abs(a).max()\n"
+            f"print((time.perf_counter() - t) / {units})\n")
+    env = dict(os.environ, OMP_NUM_THREADS="1", OPENBLAS_NUM_THREADS="1", MKL_NUM_THREADS="1")
+    res = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    return float(res.stdout.strip())
+
+
+def do_parallel_work():
+    """Esegue WORK_UNITS prodotti su PROCS processi (o THREADS thread BLAS) e misura
+    throughput per core ed efficienza parallela rispetto all'esecuzione su un core."""
+    global PROGRESS
+    cores = max(PROCS, THREADS)
+    if UNIT_TIME_1CORE:
+        unit_time_1core, calibration = UNIT_TIME_1CORE, "harness"
+    else:
+        # Misurata con gli altri job del nodo già in esecuzione: può essere sovrastimata
+        unit_time_1core, calibration = calibrate_unit_time(), "in_job"
+    cpu_before = os.times()
+
+    start = time.perf_counter()
+    if PROCS > 1:
+        # Quantità fissa di lavoro divisa in chunk (~8 per processo): bilancia il carico e
+        # permette di contare il progresso man mano che i chunk finiscono
+        chunk = max(WORK_UNITS // (PROCS * 8), 1)
+        shares = [min(chunk, WORK_UNITS - i) for i in range(0, WORK_UNITS, chunk)]
+        with multiprocessing.Pool(PROCS, initializer=_pool_init) as pool:
+            for done in pool.imap_unordered(_matmul_units, shares):
+                PROGRESS += done
+        mode = "procs"
+    else:
+        _matmul_units(WORK_UNITS)
+        mode = "threads"
+    wall = time.perf_counter() - start
+
+    cpu_after = os.times()
+    cpu_time = ((cpu_after.user + cpu_after.system + cpu_after.children_user + cpu_after.children_system)
+                - (cpu_before.user + cpu_before.system + cpu_before.children_user + cpu_before.children_system))
+    ideal_wall = unit_time_1core * WORK_UNITS / cores
+    return {
+        "mode": mode,
+        "cores_requested": cores,
+        "work_units": WORK_UNITS,
+        "matrix_size": PARALLEL_MATRIX_SIZE,
+        "unit_time_1core": unit_time_1core,
+        # "harness" = calibrazione su nodo libero, "in_job" = possibile contesa
+        "calibration": calibration,
+        "wall_s": wall,
+        "cpu_time_s": cpu_time,
+        # Core effettivamente usati in media (cpu_time / wall)
+        "effective_cores": cpu_time / wall if wall > 0 else None,
+        "units_per_sec": WORK_UNITS / wall,
+        "per_core_units_per_sec": WORK_UNITS / wall / cores,
+        "parallel_efficiency": ideal_wall / wall if wall > 0 else None
+    }
+
+
 def run_job():
-    print(f"[WORKER] Starting job {JOB_ID} on {socket.gethostname()} (Type: {JOB_TYPE}, Duration: {DURATION}s)")
+    print(f"[WORKER] Starting job {JOB_ID} on {NODE_NAME} (Type: {JOB_TYPE}, Duration: {DURATION}s)")
     start_ts = time.time()
     start_dt = datetime.now().isoformat()
+    signal.signal(signal.SIGTERM, _on_sigterm)
+
+    if GANG_SIZE > 1:
+        # Marker di avvio: permette all'harness di vedere i piazzamenti parziali mentre il gang gira
+        try:
+            with open(os.path.join(get_output_dir(), f"{RESULT_NAME}.started"), "w") as f:
+                json.dump({"job_id": JOB_ID, "member": GANG_MEMBER, "node": NODE_NAME,
+                           "start_ts": start_ts}, f)
+        except Exception as e:
+            print(f"[WORKER] Could not write start marker: {e}")
+
+    parallel_stats = None
+    barrier_wait = None
+    heartbeats = start_heartbeats()
 
     try:
+        if GANG_SIZE > 1:
+            barrier_wait = wait_for_gang()
+            print(f"[WORKER] Gang {JOB_ID} complete after {barrier_wait:.2f}s at the barrier")
+
         if JOB_TYPE == "cpu":
             do_cpu_work(DURATION)
         elif JOB_TYPE == "io":
             do_io_work(DURATION)
+        elif JOB_TYPE == "parallel":
+            parallel_stats = do_parallel_work()
+        elif JOB_TYPE == "noop":
+            # Nessun lavoro: misura solo l'overhead di orchestrazione + avvio container
+            pass
         else:
             # Default sleep (utile per test di scheduling puro)
             time.sleep(DURATION)
@@ -48,11 +316,23 @@ def run_job():
         status = "completed"
         error_msg = None
 
+    except Terminated:
+        stop_heartbeats(heartbeats)
+        write_killed_record(start_ts)
+        exit(143)
+
+    except GangBarrierTimeout as e:
+        print(f"[WORKER] Gang barrier timeout: {e}")
+        status = "barrier_timeout"
+        error_msg = str(e)
+        barrier_wait = time.time() - start_ts
+
     except Exception as e:
         print(f"[WORKER] Exception: {e}")
         status = "failed"
         error_msg = str(e)
 
+    stop_heartbeats(heartbeats)
     end_ts = time.time()
     end_dt = datetime.now().isoformat()
     real_duration = end_ts - start_ts
@@ -60,7 +340,7 @@ def run_job():
     #to write in the shared volume
     result_data = {
         "job_id": JOB_ID,
-        "node": socket.gethostname(),
+        "node": NODE_NAME,
         "status": status,
         "job_type": JOB_TYPE,
         "start_ts": start_ts,
@@ -69,21 +349,23 @@ def run_job():
         "end_dt": end_dt,
         "duration_target": DURATION,
         "duration_real": real_duration,
+        "gang_size": GANG_SIZE,
+        "gang_member": GANG_MEMBER,
+        # Secondi passati ad aspettare gli altri membri (inclusi in duration_real)
+        "barrier_wait_s": barrier_wait,
+        "parallel": parallel_stats,
+        "resources": RESOURCES or None,
+        "progress_iterations": PROGRESS,
         "error": error_msg
     }
 
-    # Assicuriamoci che la directory esista (se il volume è montato correttamente)
-    if not os.path.exists(OUTPUT_DIR):
-        print(f"[WORKER] Warning: Output dir {OUTPUT_DIR} does not exist. Using /tmp")
-        final_output_dir = "/tmp"
-    else:
-        final_output_dir = OUTPUT_DIR
-
-    output_file = os.path.join(final_output_dir, f"{JOB_ID}.json")
+    output_file = os.path.join(get_output_dir(), f"{RESULT_NAME}.json")
 
     try:
-        with open(output_file, "w") as f:
+        # Scrittura atomica: chi fa polling non vede mai un file .json a metà
+        with open(output_file + ".tmp", "w") as f:
             json.dump(result_data, f)
+        os.replace(output_file + ".tmp", output_file)
         print(f"[WORKER] Result written to {output_file}")
     except Exception as e:
         print(f"[WORKER] CRITICAL: Could not write result file! {e}")